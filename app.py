@@ -38,19 +38,19 @@ root_logger.addFilter(ModuleFilter(['_internal.py', '_config.py', '_trace.py']))
 
 # Configure logging only once
 if not getattr(sys, 'logging_configured', False):
-    # Set the logging level for all loggers to ERROR
-    logging.basicConfig(level=logging.ERROR)
+    # Queue-based pipeline at Config.LOG_LEVEL, with per-run log files
+    from utils.logger_config import setup_logger
+    setup_logger()
     
     # Mark logging as configured
     sys.logging_configured = True
 
 # Now import the rest of the modules
-from flask import Flask, render_template, request, jsonify, Response, stream_with_context, make_response
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, make_response, url_for
 from flask_cors import CORS
 from pathlib import Path
-from research_coordinator import build_research_plan, deep_sprint_topic, generate_final_report
+from research_coordinator import build_research_plan, deep_sprint_topic, generate_final_report, stream_final_report
 import json
-from threading import Thread
 from queue import Queue
 from argparse import ArgumentParser
 from config import test_mode, set_test_mode
@@ -59,14 +59,22 @@ from dotenv import load_dotenv, set_key
 import os  # Add this import for os.environ
 from flask_wtf.csrf import CSRFProtect
 from flask_session import Session
+from utils.catalog import run_catalog
+from utils.config import Config
 from utils.crewid import CrewID
-from xhtml2pdf import pisa
-from io import BytesIO
-import tempfile
-from datetime import datetime
+from utils.cache import cache_key, content_digest
+from utils.checkpoint import RunInProgressError, RunManifest
+from utils.delivery import compress_response, not_modified, set_validators
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from utils.pdf_renderer import pdf_renderer
+from utils.run_context import run_context
+from utils.run_stats import RunStats
+from utils.scheduler import scheduler
+from utils.url_registry import UrlRegistry
+from utils.writer import artifact_writer
+import re
+import time
 
-
-logging.basicConfig(level=logging.DEBUG, format='%(name)s - %(levelname)s - %(message)s')
 logging.getLogger("_base_client").disabled = True
 
 logger = logging.getLogger(__name__)
@@ -97,12 +105,26 @@ def get_model_status():
     else:
         return "No model configured"
 
+def request_crewid() -> str:
+    """
+    The crew ID a request works on: the one the client sent, otherwise a fresh one.
+    Concurrent users each get their own, so their runs never share folders.
+    """
+    crewid = (request.get_json(silent=True) or {}).get('crewid') or request.form.get('crewid')
+    if crewid and re.fullmatch(r'[\w-]+', str(crewid)):
+        return str(crewid)
+    crewid = CrewID.new_crewid()
+    logger.warning(f"Request to {request.path} sent no valid crew ID; using new crew ID {crewid}")
+    return crewid
+
 @app.after_request
 def add_header(response):
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '-1'
-    return response
+    # Routes with their own caching policy (immutable artifacts, revalidated runs) keep it
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '-1'
+    return compress_response(response)
 
 @app.route('/')
 def index():
@@ -115,9 +137,12 @@ def regenerate_plan():
     research_topic = request.form['research_topic']
     
     # Force regeneration of a new 4-digit crewID
-    CrewID.generate_crewid()
+    crewid = CrewID.generate_crewid()
     
-    research_plan = build_research_plan(research_topic)
+    with run_context(crewid):
+        research_plan = build_research_plan(research_topic)
+    # The next request reads the plan file from disk
+    artifact_writer.flush(crewid)
     
     # Extract just the research steps, excluding entities and research_topic
     research_steps = {k: v for k, v in research_plan.items() 
@@ -130,15 +155,16 @@ def regenerate_plan():
     return jsonify(research_plan=research_steps, 
                   research_results=None, 
                   test_mode=test_mode,
-                  crewid=CrewID.get_crewid(),
+                  crewid=crewid,
                   entities=research_plan.get('entities', {}),
                   search_terms=search_terms)  # Include search_terms
 
 @app.route('/execute_deep_sprint', methods=['POST'])
 def execute_deep_sprint():
+    request_started = time.monotonic()
     research_steps = request.json.get('research_steps', [])
     entities = request.json.get('entities', {})
-    research_id = CrewID.get_crewid()
+    research_id = request_crewid()
     
     # Try to get search_terms and entities from cache first
     if research_id in research_plan_cache:
@@ -146,7 +172,7 @@ def execute_deep_sprint():
         # If entities were passed empty but we have them in cache, use the cached ones
         if not entities and 'entities' in research_plan_cache[research_id]:
             entities = research_plan_cache[research_id].get('entities', {})
-        logger.debug(f"Search terms and entities loaded from cache for research_id: {research_id}")
+        logger.debug("Search terms and entities loaded from cache for research_id: %s", research_id)
     else:
         # Load from file if not in cache
         research_plan_path = f"output/{research_id}/_research_plan.json"
@@ -159,27 +185,58 @@ def execute_deep_sprint():
                 # If entities were passed empty but exist in the file, use those
                 if not entities and 'entities' in research_plan:
                     entities = research_plan.get('entities', {})
-                logger.debug(f"Search terms and entities loaded from file and cached for research_id: {research_id}")
+                logger.debug("Search terms and entities loaded from file and cached for research_id: %s", research_id)
         except Exception as e:
             logger.error(f"Error loading search terms from research plan: {e}")
             search_terms = {}
     
     # Add debug logging
-    logger.debug(f"Search terms: {search_terms}")
-    logger.debug(f"Entities: {entities}")
-    logger.debug(f"Research steps: {research_steps}")
+    logger.debug("Search terms: %s", search_terms)
+    logger.debug("Entities: %s", entities)
+    logger.debug("Research steps: %s", research_steps)
     
     # Convert research_steps to a dictionary if it's a list
     if isinstance(research_steps, list):
         research_steps_dict = {}
         for i, step in enumerate(research_steps):
-            logger.debug(f"Step {i+1}: {step}")
+            logger.debug("Step %s: %s", i+1, step)
             step_key = f"step{i+1}"
             research_steps_dict[step_key] = step
         research_steps = research_steps_dict
 
+    try:
+        manifest = RunManifest.start(research_id, research_steps, entities, search_terms)
+    except RunInProgressError as e:
+        return jsonify({'error': str(e)}), 409
+    return deep_sprint_response(research_id, manifest, request_started)
+
+@app.route('/resume/<crewid>', methods=['POST'])
+def resume_deep_sprint(crewid):
+    """
+    Continue a run from its checkpoints (output/<crewid>/manifest.json). Finished steps,
+    searches and page summaries are reused, and the final report is only generated again
+    if the step results it was made from changed. Streams the same events as /execute_deep_sprint.
+    """
+    request_started = time.monotonic()
+    manifest = RunManifest.load(crewid) if re.fullmatch(r'[\w-]+', crewid) else None
+    if manifest is None:
+        return jsonify({'error': 'No checkpoints found for this research'}), 404
+    try:
+        manifest = RunManifest.start(crewid, manifest.research_steps, manifest.entities, manifest.search_terms, resume=True)
+    except RunInProgressError as e:
+        return jsonify({'error': str(e)}), 409
+    logger.info(f"Resuming research {crewid}")
+    return deep_sprint_response(crewid, manifest, request_started)
+
+def deep_sprint_response(research_id, manifest, request_started):
+    """Run the steps and the final report of a run, streaming their results as NDJSON."""
+    research_steps = manifest.research_steps
+    entities = manifest.entities
+    search_terms = manifest.search_terms
+
     result_queue = Queue()
-    results_container = {'all_results': ''}
+    # Step results by step number; joined in step order for the final report
+    results_container = {'steps': {}}
 
     def process_step(step, step_num, step_key):
         try:
@@ -209,13 +266,17 @@ def execute_deep_sprint():
                 search_term = None  # Initialize search_term with a default value
                 if step_key in search_terms:
                     search_term = search_terms[step_key]
-                    logger.debug(f"Using search term for {step_key}: {search_term}")
+                    logger.debug("Using search term for %s: %s", step_key, search_term)
                 else:
-                    logger.debug(f"No search term found for {step_key}")
+                    logger.debug("No search term found for %s", step_key)
                 
-                logger.debug(f"Executing deep sprint for step {step_num+1} with search term: {search_term}")
-                result = deep_sprint_topic(step, step_num, entities, search_term)
-                logger.debug(f"Completed deep sprint for step {step_num+1}")
+                logger.debug("Executing deep sprint for step %s with search term: %s", step_num+1, search_term)
+                on_chunk = None
+                if Config.STREAM_STEP_REPORTS:
+                    # Partial step text goes out as it is written; it does not count as a result
+                    on_chunk = lambda text: result_queue.put({'step': step_num + 1, 'result_chunk': text})
+                result = deep_sprint_topic(step, step_num, entities, search_term, on_chunk, manifest.step(step_key))
+                logger.debug("Completed deep sprint for step %s", step_num+1)
             
             result_dict = {
                 'step': step_num + 1,
@@ -224,39 +285,82 @@ def execute_deep_sprint():
                 'execution_time': result['execution_time']
             }
             result_queue.put(result_dict)
-            # Append to string with formatting using the container
-            results_container['all_results'] += f"\nStep {step_num + 1}:\n{result['summary']}\n"
+            results_container['steps'][step_num] = f"\nStep {step_num + 1}:\n{result['summary']}\n"
         except Exception as e:
             error_dict = {
                 'step': step_num + 1,
                 'error': str(e)
             }
             result_queue.put(error_dict)
-            # Append error to string using the container
-            results_container['all_results'] += f"\nStep {step_num + 1} Error:\n{str(e)}\n"
+            results_container['steps'][step_num] = f"\nStep {step_num + 1} Error:\n{str(e)}\n"
+
+    # Step futures; the manifest stays live until they are all done
+    futures = []
+    first_byte = {}
+
+    def emit(event):
+        # Time-to-first-byte is measured from the request to the first NDJSON line sent
+        if not first_byte:
+            first_byte['ttfb'] = round(time.monotonic() - request_started, 3)
+            RunStats.set(research_id, "ttfb_seconds", first_byte['ttfb'])
+            logger.info(f"Research {research_id}: first byte after {first_byte['ttfb']}s")
+        return f"{json.dumps(event)}\n"
+
+    def is_step_result(event):
+        return 'result_chunk' not in event
 
     def generate():
-        # Start all threads
-        threads = []
+        # A client that disconnects closes the generator, which leaves the run interrupted
+        status = "interrupted"
+        try:
+            # Everything below, including the step threads, works for this request's run
+            with run_context(research_id):
+                yield from generate_in_run()
+            status = "complete"
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            # Pages fetched and summarized for this run are only shared between its steps,
+            # and are dropped however the stream ends (finished, failed or disconnected).
+            # Steps still running after a disconnect drop what they add when they finish.
+            UrlRegistry.clear(research_id)
+            for future in futures:
+                future.add_done_callback(lambda _: UrlRegistry.clear(research_id))
+            manifest.finish(status, futures)
+
+    def generate_in_run():
+        # Queue all steps on the process-wide scheduler. With Config.USE_THREADS they share
+        # the bounded step pool with other requests, otherwise each runs as it is submitted.
+        results_received = 0
         for i, (step_key, step_value) in enumerate(research_steps.items()):
-            thread = Thread(target=process_step, args=(step_value, i, step_key))
-            thread.start()
-            threads.append(thread)
+            futures.append(scheduler.submit_step(process_step, step_value, i, step_key))
+            # Stream results of steps that already ran inline
+            while not result_queue.empty():
+                result = result_queue.get()
+                if is_step_result(result):
+                    results_received += 1
+                yield emit(result)
 
         # Yield results as they become available
-        results_received = 0
         while results_received < len(research_steps):
             result = result_queue.get()
-            results_received += 1
-            yield f"{json.dumps(result)}\n"
-
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-
-        # Use the container to access all_results
-        if results_container['all_results']:
-            if test_mode:
+            if is_step_result(result):
+                results_received += 1
+            yield emit(result)
+
+        # Wait for all steps to complete
+        for future in futures:
+            future.result()
+
+        all_results = "".join(results_container['steps'][n] for n in sorted(results_container['steps']))
+        inputs_digest = content_digest(all_results)
+        saved_report = manifest.final_report(inputs_digest)
+        if all_results:
+            if saved_report is not None:
+                # Nothing changed since the final report was generated
+                yield emit({'final_report': saved_report})
+            elif test_mode:
                 final_report = """
                 # Comprehensive Research Synthesis
                 
@@ -287,37 +391,113 @@ def execute_deep_sprint():
                 ## Conclusion
                 This research provides a foundation for deeper understanding and practical applications within the domain. The multi-faceted approach has yielded a more nuanced perspective than previous single-dimension studies.
                 """
+                yield emit({'final_report': final_report})
+            elif Config.STREAM_FINAL_REPORT:
+                # Forward report tokens as they are generated; the last event carries the
+                # complete styled report, the same artifact that is saved to disk
+                final_started = time.monotonic()
+                first_token = False
+                for event in stream_final_report(all_results):
+                    if not first_token and 'final_report_chunk' in event:
+                        first_token = True
+                        final_ttfb = round(time.monotonic() - final_started, 3)
+                        RunStats.set(research_id, "final_report_ttfb_seconds", final_ttfb)
+                        logger.info(f"Research {research_id}: first final report token after {final_ttfb}s")
+                    if 'final_report' in event:
+                        manifest.record_final_report(event['final_report'], inputs_digest)
+                    yield emit(event)
             else:
-                final_report = generate_final_report(results_container['all_results'])
-            yield f"{json.dumps({'final_report': final_report})}\n"
+                final_report = generate_final_report(all_results)
+                manifest.record_final_report(final_report, inputs_digest)
+                yield emit({'final_report': final_report})
+
+        # The run is complete once all of its artifacts are on disk
+        artifact_writer.flush(research_id)
 
-    return Response(
+    response = Response(
         stream_with_context(generate()),
         mimetype='application/x-ndjson'
     )
+    # A stream that is closed before it starts never runs generate()'s cleanup
+    response.call_on_close(lambda: manifest.finish("interrupted", futures))
+    return response
 
 @app.route('/list_research', methods=['GET'])
 def list_research():
+    """
+    List past runs from the run catalog, most recently updated first.
+
+    Query parameters: q (text in the crew ID or topic), status (planned, running or
+    complete), limit and offset for paging.
+    """
     try:
-        output_dir = Path('output')
-        if not output_dir.exists():
-            return jsonify({'folders': []})
-            
-        # Get all subdirectories (crew IDs)
-        folders = [f.name for f in output_dir.iterdir() if f.is_dir()]
-        return jsonify({'folders': folders})
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        runs, total = run_catalog.list_runs(
+            query=request.args.get('q') or None,
+            status=request.args.get('status') or None,
+            limit=limit if limit is None else max(limit, 0),
+            offset=max(offset, 0),
+        )
+        return jsonify({'folders': [run['crewid'] for run in runs], 'runs': runs, 'total': total})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+ARTIFACT_CACHE_CONTROL = f'private, max-age={Config.ARTIFACT_MAX_AGE}, immutable'
+RUN_CACHE_CONTROL = 'private, no-cache'
+ARTIFACT_MIMETYPES = {'.html': 'text/html', '.json': 'application/json'}
+
+@app.route('/get_research/<crewid>/artifacts/<name>', methods=['GET'])
+def get_research_artifact(crewid, name):
+    """Serve one artifact of a run. Artifacts are never rewritten, so they are cached by content hash."""
+    artifact = run_catalog.get_artifact(crewid, name)
+    if artifact is None:
+        return jsonify({'error': 'Artifact not found'}), 404
+    response = not_modified(artifact['digest'], ARTIFACT_CACHE_CONTROL)
+    if response is not None:
+        return response
+    try:
+        with open(artifact['path'], 'r', encoding='utf-8') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return jsonify({'error': 'Artifact not found'}), 404
+    response = make_response(content)
+    response.mimetype = ARTIFACT_MIMETYPES.get(Path(name).suffix, 'text/plain')
+    return set_validators(response, artifact['digest'], ARTIFACT_CACHE_CONTROL)
+
 @app.route('/get_research/<crewid>', methods=['GET'])
 def get_research(crewid):
+    """
+    Return a run's topic, plan, step reports and final report.
+
+    With ?lazy=1, step reports are returned as {'url': ...} links to their artifact
+    endpoint instead of inline, so the UI can load them when they are opened.
+    """
     try:
         crew_dir = Path(f'output/{crewid}')
-        if not crew_dir.exists():
+        # The run catalog knows where the run's artifacts are; runs it has not indexed are probed on disk
+        catalog_run = run_catalog.get_run(crewid)
+        if catalog_run is None and not crew_dir.exists():
             return jsonify({'error': 'Research not found'}), 404
-            
+        artifacts = catalog_run['artifacts'] if catalog_run else []
+        lazy = bool(catalog_run) and request.args.get('lazy', '').lower() in ('1', 'true')
+
+        # A catalogued run changes only when an artifact is added, so its artifacts' digests identify it
+        etag = None
+        if catalog_run:
+            etag = cache_key(crewid, lazy, *(a['digest'] for a in artifacts))
+            response = not_modified(etag, RUN_CACHE_CONTROL)
+            if response is not None:
+                return response
+
+        def catalog_path(kind):
+            paths = [Path(a['path']) for a in artifacts if a['kind'] == kind]
+            return paths[-1] if paths else None
+
         # Get research plan
-        plan_file = crew_dir / '_research_plan.json'  # Try with underscore prefix first
+        plan_file = catalog_path('plan')
+        if plan_file is None:
+            plan_file = crew_dir / '_research_plan.json'  # Try with underscore prefix first
         if not plan_file.exists():
             plan_file = crew_dir / 'research_plan.json'  # Then try without underscore
             
@@ -387,13 +567,20 @@ def get_research(crewid):
         
         # If no results found, check for individual HTML files (like 0_step_report.html)
         if not research_results:
-            step_files = list(crew_dir.glob('*_step_report.html'))
+            if catalog_run:
+                step_files = [(a['step'], Path(a['path'])) for a in artifacts if a['kind'] == 'step']
+            else:
+                # Extract step number from filename (e.g., "0_step_report.html" -> "0")
+                step_files = [(f.name.split('_')[0], f) for f in crew_dir.glob('*_step_report.html')]
             if step_files:
                 logger.info(f"Found {len(step_files)} individual step report files for crew {crewid}")
-                for step_file in step_files:
+                for step_num, step_file in step_files:
+                    if lazy:
+                        research_results[step_num] = {
+                            'url': url_for('get_research_artifact', crewid=crewid, name=step_file.name)
+                        }
+                        continue
                     try:
-                        # Extract step number from filename (e.g., "0_step_report.html" -> "0")
-                        step_num = step_file.name.split('_')[0]
                         with open(step_file, 'r') as f:
                             content = f.read()
                             research_results[step_num] = content
@@ -413,7 +600,7 @@ def get_research(crewid):
         
         # If no final report found, check for final_final_report.html
         if not final_report:
-            final_html_file = crew_dir / 'final_final_report.html'
+            final_html_file = catalog_path('final') or crew_dir / 'final_final_report.html'
             if final_html_file.exists():
                 try:
                     with open(final_html_file, 'r') as f:
@@ -431,7 +618,7 @@ def get_research(crewid):
         if not research_topic and (research_results or final_report):
             research_topic = "Research topic (recovered from results)"
         
-        return jsonify({
+        response = jsonify({
             'research_topic': research_topic,
             'research_plan': research_plan,
             'research_results': research_results,
@@ -439,6 +626,9 @@ def get_research(crewid):
             'entities': entities,  # Include entities separately
             'crewid': crewid
         })
+        if etag:
+            set_validators(response, etag, RUN_CACHE_CONTROL)
+        return response
     except Exception as e:
         logger.exception(f"Error retrieving research for crew {crewid}")
         return jsonify({'error': str(e), 'crewid': crewid}), 500
@@ -507,9 +697,36 @@ def set_crewid(crewid):
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/run_stats/<crewid>', methods=['GET'])
+def get_run_stats(crewid):
+    """Per-run counters such as page cache hits and misses."""
+    return jsonify({"crewid": crewid, "stats": RunStats.get(crewid)})
+
+@app.route('/scheduler_stats', methods=['GET'])
+def get_scheduler_stats():
+    """Process-wide scheduler limits, in-flight work and queue depth."""
+    return jsonify(scheduler.stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Process-wide latency histograms, counters and gauges in the Prometheus text format."""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def pdf_response(pdf_data: bytes, filename: str):
+    response = make_response(pdf_data)
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @app.route('/generate_pdf', methods=['POST'])
 def generate_pdf():
-    """Generate a PDF using xhtml2pdf based on the content provided."""
+    """
+    Generate a PDF using xhtml2pdf based on the content provided.
+
+    A PDF that was rendered before is returned right away. Otherwise rendering is queued
+    on the PDF worker pool and a 202 response points at /pdf_jobs/<job_id>, which is
+    polled until it returns the PDF.
+    """
     try:
         data = request.json
         title = data.get('title', 'Research Step')
@@ -519,85 +736,17 @@ def generate_pdf():
         # Determine if this is a complete report
         is_complete_report = step_number == 'complete'
         
-        # Create HTML content with appropriate styling
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{title}</title>
-            <meta charset="UTF-8">
-            <style>
-                @page {{
-                    size: a4;
-                    margin: 1cm;
-                }}
-                body {{ 
-                    font-family: Arial, sans-serif; 
-                    margin: 40px; 
-                    line-height: 1.6; 
-                    color: #333;
-                }}
-                h1 {{ 
-                    color: #2c3e50; 
-                    border-bottom: 1px solid #eee; 
-                    padding-bottom: 10px;
-                    font-size: 24px;
-                }}
-                h2 {{ 
-                    color: #3498db; 
-                    margin-top: 20px;
-                    font-size: 20px;
-                }}
-                h3 {{ 
-                    color: #2980b9;
-                    font-size: 18px;
-                }}
-                table {{
-                    border-collapse: collapse;
-                    width: 100%;
-                    margin: 20px 0;
-                }}
-                th, td {{
-                    border: 1px solid #ddd;
-                    padding: 8px;
-                    text-align: left;
-                }}
-                th {{
-                    background-color: #f2f2f2;
-                }}
-                .citation {{
-                    font-size: 12px;
-                    color: #7f8c8d;
-                    margin-top: 5px;
-                }}
-                .footer {{
-                    text-align: center;
-                    font-size: 12px;
-                    margin-top: 30px;
-                    color: #7f8c8d;
-                }}
-                ul, ol {{
-                    margin-left: 20px;
-                }}
-                img {{
-                    max-width: 100%;
-                    height: auto;
-                }}
-            </style>
-        </head>
-        <body>
-            {content}
-            <div class="footer">
-                Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-            </div>
-        </body>
-        </html>
-        """
+        # Determine filename based on whether it's a complete report
+        if is_complete_report:
+            filename = "complete_research_report.pdf"
+        else:
+            filename = f"research_step_{step_number}.pdf"
         
         # Save the PDF generation prompt
         from utils.capabilities.File import File
-        from utils.crewid import CrewID
-        crewid = CrewID.get_crewid()
+        crewid = request_crewid()
+        # Rendered once: logged with the prompt below and handed to the PDF pool
+        html = pdf_renderer.render_html(content, title)
         
         pdf_prompt = f"""
         PDF Generation for: {title}
@@ -605,61 +754,46 @@ def generate_pdf():
         Is Complete Report: {is_complete_report}
         
         HTML Content Template:
-        {html_content}
+        {html}
         """
         
         File.save_prompt(crewid, f"pdf_generation_{step_number}", pdf_prompt)
         
-        # Create a temporary file to store the HTML
-        with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as html_file:
-            html_file.write(html_content.encode('utf-8'))
-            html_file_path = html_file.name
-        
-        # Create a temporary file for the PDF
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_file:
-            pdf_file_path = pdf_file.name
-        
-        # Convert HTML to PDF
-        pisa_status = pisa.CreatePDF(
-            html_content,
-            dest=open(pdf_file_path, "wb")
-        )
-        
-        if pisa_status.err:
-            os.unlink(html_file_path)
-            os.unlink(pdf_file_path)
-            return jsonify({"status": "error", "message": "PDF generation failed"}), 500
-        
-        # Read the PDF file
-        with open(pdf_file_path, 'rb') as pdf:
-            pdf_data = pdf.read()
-        
-        # Clean up temporary files
-        os.unlink(html_file_path)
-        os.unlink(pdf_file_path)
-        
-        # Determine filename based on whether it's a complete report
-        if is_complete_report:
-            filename = "complete_research_report.pdf"
-        else:
-            filename = f"research_step_{step_number}.pdf"
-        
-        # Create response with PDF data
-        response = make_response(pdf_data)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        job_id = pdf_renderer.submit(content, title, html)
+        status, pdf_data = pdf_renderer.result(job_id)
+        if status == "done":
+            return pdf_response(pdf_data, filename)
         
-        return response
+        return jsonify({
+            "status": "pending",
+            "job_id": job_id,
+            "status_url": url_for('get_pdf_job', job_id=job_id, filename=filename)
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/pdf_jobs/<job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    """Poll a PDF job: 202 while it renders, then the PDF itself."""
+    status, result = pdf_renderer.result(job_id)
+    if status == "done":
+        filename = request.args.get('filename', 'research_report.pdf')
+        if not re.fullmatch(r'[\w.-]+\.pdf', filename):
+            filename = 'research_report.pdf'
+        return pdf_response(result, filename)
+    if status == "pending":
+        return jsonify({"status": "pending", "job_id": job_id}), 202
+    if status == "error":
+        return jsonify({"status": "error", "message": result}), 500
+    return jsonify({"status": "error", "message": "Unknown PDF job"}), 404
+
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('--test', action='store_true', help='Run in test mode with mock data')
     args = parser.parse_args()
     
     # Update test_mode using the new function from config
-    logger.debug(f"Setting mode to {'test' if args.test else 'production'} mode")
+    logger.debug("Setting mode to %s mode", 'test' if args.test else 'production')
     set_test_mode(args.test)
     
     # Import test_mode again after setting it
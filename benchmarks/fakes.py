@@ -0,0 +1,167 @@
+"""
+Deterministic stand-ins for the services a research run talks to: the chat model, the
+Serper API and the web pages it links to. Everything is derived from the request itself,
+so two runs with the same settings do the same work.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def _words(seed: str, count: int) -> str:
+    """count pseudo-words that depend only on seed."""
+    base = int(_digest(seed)[:8], 16)
+    return " ".join(f"w{(base + j * 7919) % 5000}" for j in range(count))
+
+
+class FakeChatModel:
+    """
+    Chat model with a fixed time to first token and a fixed output rate. Planning prompts
+    get well-formed JSON answers; every other prompt gets an HTML report of report_tokens
+    tokens (page summaries get summary_tokens).
+    """
+
+    model_name = "fake-benchmark-model"
+
+    def __init__(self, steps: int = 5, latency: float = 0.2, tokens_per_second: float = 200.0,
+                 report_tokens: int = 600, summary_tokens: int = 150):
+        self.steps = steps
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.report_tokens = report_tokens
+        self.summary_tokens = summary_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def answer(self, prompt: str) -> str:
+        """The response to a prompt, recognized by the markers of the app's own prompts."""
+        with self._lock:
+            self.calls += 1
+        seed = _digest(prompt)[:8]
+        steps = {f"step{i}": f"Research angle {i} ({seed})" for i in range(1, self.steps + 1)}
+        terms = {f"step{i}": f"angle {i} {seed}" for i in range(1, self.steps + 1)}
+        entities = {"entity1": f"Entity {seed}", "entity2": "Second entity", "entity3": "Third entity"}
+        if '"plan"' in prompt and '"search_terms"' in prompt:
+            return json.dumps({"plan": steps, "entities": entities, "search_terms": terms})
+        if '"entity1"' in prompt:
+            return json.dumps(entities)
+        if "create a research plan for" in prompt:
+            return json.dumps(steps)
+        if "Google search term" in prompt:
+            return json.dumps(terms)
+        if '{"query":' in prompt:
+            return json.dumps({"query": f'("{seed}" OR "angle") research'})
+        if prompt.lstrip().startswith(("Here is a text:", "A long text was split")):
+            return f"<p>{_words(seed, self.summary_tokens)}</p>"
+        return f"<h1>Report {seed}</h1><p>{_words(seed, self.report_tokens - 4)}</p>"
+
+    def _duration(self, text: str) -> float:
+        return self.latency + len(text.split()) / self.tokens_per_second
+
+    async def ainvoke(self, prompt: str) -> AIMessage:
+        text = self.answer(prompt)
+        await asyncio.sleep(self._duration(text))
+        return AIMessage(content=text)
+
+    async def astream(self, prompt: str):
+        words = self.answer(prompt).split(" ")
+        await asyncio.sleep(self.latency)
+        # Chunks of 8 tokens keep the sleep granularity sane at high token rates
+        for start in range(0, len(words), 8):
+            chunk = words[start:start + 8]
+            await asyncio.sleep(len(chunk) / self.tokens_per_second)
+            yield AIMessageChunk(content=" ".join(chunk) + " ")
+
+
+def install_model(model) -> None:
+    """Make model the default model of every module that captured it at import time."""
+    for name in ("utils.config", "utils.llm", "utils.capabilities.Text", "research_coordinator"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.default_model = model
+
+
+class _Server:
+    """A ThreadingHTTPServer on a free local port, serving in a daemon thread."""
+
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+
+
+def start_fixture_site(latency: float = 0.05, words: int = 800, failure_every: int = 7,
+                       duplicate_every: int = 5) -> _Server:
+    """
+    Serve /<slug>/page<n> pages of words pseudo-words after latency seconds. Every
+    failure_every-th page is a 404 and every duplicate_every-th page repeats the text of
+    page 0 of its slug, so fetch failures and near-duplicate skipping are exercised too.
+    """
+
+    class Site(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = re.match(r"^/(\w+)/page(\d+)", self.path)
+            if not match:
+                self.send_error(404)
+                return
+            slug, n = match.group(1), int(match.group(2))
+            time.sleep(latency)
+            if failure_every and n % failure_every == failure_every - 1:
+                self.send_error(404)
+                return
+            source = 0 if duplicate_every and n % duplicate_every == duplicate_every - 1 else n
+            body = f"<html><body><h1>{slug} page {n}</h1><p>{_words(f'{slug}/{source}', words)}</p></body></html>"
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return _Server(Site)
+
+
+def start_serper(site_url: str, latency: float = 0.05) -> _Server:
+    """Answer Serper /search and /news requests with links into the fixture site, one slug per query."""
+
+    class Serper(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            slug = _digest(payload.get("q", ""))[:10]
+            results = [
+                {"title": f"Result {i}", "link": f"{site_url}/{slug}/page{i}", "snippet": "", "position": i + 1}
+                for i in range(int(payload.get("num", 10)))
+            ]
+            data = json.dumps({"organic": results, "news": results}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return _Server(Serper)
@@ -0,0 +1,184 @@
+"""
+Offline end-to-end benchmark of the research pipeline.
+
+Runs build_research_plan, deep_sprint_topic, generate_final_report and the full
+/execute_deep_sprint stream against a fake chat model, a local Serper stand-in and a local
+fixture website, and reports per-stage timings as JSON that can be compared across commits:
+
+    python benchmarks/run.py --output before.json
+    git checkout <other commit>
+    python benchmarks/run.py --output after.json --compare before.json
+
+Each run works in a fresh temporary directory with empty caches, and every repeat researches
+a new topic, so nothing is served from the caches of an earlier repeat or run.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fakes import FakeChatModel, install_model, start_fixture_site, start_serper  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (default: 3)")
+    parser.add_argument("--steps", type=int, default=3, help="Research steps per plan (default: 3)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds to the first token of every model call (default: 0.2)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Model output rate (default: 200)")
+    parser.add_argument("--report-tokens", type=int, default=600, help="Length of step and final reports (default: 600)")
+    parser.add_argument("--summary-tokens", type=int, default=150, help="Length of page summaries (default: 150)")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="Seconds the fixture site takes per page (default: 0.05)")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Seconds the Serper stand-in takes per query (default: 0.05)")
+    parser.add_argument("--output", help="Write the results to this JSON file (default: stdout)")
+    parser.add_argument("--compare", help="Print the change in median time per stage against this earlier results file")
+    return parser.parse_args()
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "samples": [round(s, 4) for s in samples],
+        "min": round(min(samples), 4),
+        "median": round(statistics.median(samples), 4),
+        "mean": round(statistics.fmean(samples), 4),
+        "max": round(max(samples), 4),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    site = start_fixture_site(latency=args.page_latency)
+    serper = start_serper(site.url, latency=args.search_latency)
+    workdir = Path(tempfile.mkdtemp(prefix="deepsprint-bench-"))
+
+    # The app reads these at import time; output/ and prompts/ are relative to the working directory
+    os.environ.update({
+        "SERPER_BASE_URL": serper.url,
+        "SERPER_API_KEY": "benchmark",
+        "LM_STUDIO_URL": os.environ.get("LM_STUDIO_URL", "http://127.0.0.1:9/v1"),
+        "CACHE_DIR": str(workdir / "cache"),
+        "CREWAI_TOOLS_ALLOW_UNSAFE_PATHS": "true",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "ERROR"),
+    })
+    os.chdir(workdir)
+
+    import app as app_module
+    import research_coordinator
+    from utils.run_context import run_context
+    from utils.run_stats import RunStats
+    from utils.writer import artifact_writer
+
+    model = FakeChatModel(steps=args.steps, latency=args.llm_latency, tokens_per_second=args.tokens_per_second,
+                          report_tokens=args.report_tokens, summary_tokens=args.summary_tokens)
+    install_model(model)
+    app_module.app.config["WTF_CSRF_ENABLED"] = False
+    client = app_module.app.test_client()
+
+    stages = {name: [] for name in (
+        "build_research_plan", "deep_sprint_topic", "generate_final_report",
+        "execute_deep_sprint_ttfb", "execute_deep_sprint_first_report_token", "execute_deep_sprint",
+    )}
+    llm_calls = []
+
+    for repeat in range(args.repeat):
+        # Stage by stage, as the app calls them
+        crewid = f"bench{repeat}a"
+        with run_context(crewid):
+            started = time.perf_counter()
+            plan = research_coordinator.build_research_plan(f"Benchmark topic {repeat} (stages)")
+            stages["build_research_plan"].append(time.perf_counter() - started)
+
+            steps = {key: value for key, value in plan.items() if key.startswith("step")}
+            all_results = ""
+            for number, (key, step) in enumerate(steps.items()):
+                started = time.perf_counter()
+                result = research_coordinator.deep_sprint_topic(
+                    step, number, plan.get("entities", {}), plan.get("search_terms", {}).get(key))
+                stages["deep_sprint_topic"].append(time.perf_counter() - started)
+                all_results += f"\nStep {number + 1}:\n{result['summary']}\n"
+
+            started = time.perf_counter()
+            research_coordinator.generate_final_report(all_results)
+            stages["generate_final_report"].append(time.perf_counter() - started)
+        artifact_writer.flush(crewid)
+        llm_calls.append(RunStats.get(crewid).get("llm_calls", 0))
+
+        # The whole stream, as the browser sees it
+        crewid = f"bench{repeat}b"
+        with run_context(crewid):
+            plan = research_coordinator.build_research_plan(f"Benchmark topic {repeat} (stream)")
+        steps = [value for key, value in plan.items() if key.startswith("step")]
+        started = time.perf_counter()
+        response = client.post("/execute_deep_sprint", json={"research_steps": steps, "crewid": crewid})
+        first_line = first_token = None
+        for line in response.response:
+            now = time.perf_counter() - started
+            first_line = first_line if first_line is not None else now
+            if first_token is None and b"final_report_chunk" in line:
+                first_token = now
+        stages["execute_deep_sprint"].append(time.perf_counter() - started)
+        stages["execute_deep_sprint_ttfb"].append(first_line)
+        if first_token is not None:
+            stages["execute_deep_sprint_first_report_token"].append(first_token)
+        artifact_writer.flush(crewid)
+
+    site.close()
+    serper.close()
+    return {
+        "benchmark": "deepsprint-offline",
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "llm_calls_per_staged_run": llm_calls,
+        "stages": {name: summarize(samples) for name, samples in stages.items() if samples},
+    }
+
+
+def compare(results: dict, baseline_path: Path) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    print(f"Median seconds, {baseline.get('commit')} -> {results.get('commit')}:", file=sys.stderr)
+    for name, stage in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before is None:
+            print(f"  {name:42} {'':>9}   {stage['median']:9.3f}  (new)", file=sys.stderr)
+            continue
+        change = (stage["median"] - before["median"]) / before["median"] * 100 if before["median"] else 0.0
+        print(f"  {name:42} {before['median']:9.3f} -> {stage['median']:9.3f}  ({change:+.1f}%)", file=sys.stderr)
+
+
+def main():
+    args = parse_args()
+    # run() changes the working directory, so paths are resolved first
+    output = Path(args.output).resolve() if args.output else None
+    baseline = Path(args.compare).resolve() if args.compare else None
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if output:
+        output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 from datetime import date, datetime
+import asyncio
 import re
+import time
 
-from utils.config import default_model
+from utils.config import Config, default_model
+from utils import llm
+from utils.cache import TieredCache, cache_key, content_digest
+from utils.metrics import cache_requests, steps_in_flight, track_stage
+from utils.run_stats import RunStats
+from utils.aio import run_sync, run_graph, iterate_sync
 from utils.utils import get_report_css_style
+from utils.tokens import estimate_tokens, truncate_to_tokens
 from utils.capabilities.Search import Search
 from utils.capabilities.Browser import Browser
 import logging
@@ -10,84 +18,28 @@ import json
 from utils.crewid import CrewID
 from config import test_mode
 from utils.capabilities.File import File
-logging.basicConfig(level=logging.DEBUG, format='%(name)s - %(levelname)s - %(message)s')
 
 logging.getLogger("_base_client").disabled = True
 
 
 logger = logging.getLogger(__name__)
 
+# Finished step and final reports, keyed by their inputs (see _step_report_key and _afinal_report_key)
+_reports = TieredCache("reports",
+                       memory_bytes=Config.Cache.REPORT_MEMORY_BYTES,
+                       disk_bytes=Config.Cache.REPORT_MAX_BYTES,
+                       ttl=Config.Cache.REPORT_DATE_BUCKET_HOURS * 60 * 60)
 
-def build_research_plan(research_topic: str) -> dict:
-    """
-    Builds a research plan based on the given topic.
-    
-    Args:
-        research_topic (str): The topic to create a research plan for
-        
-    Returns:
-        dict: A formatted research plan
-    """
-    start_time = datetime.now()
-    logger.debug(f"Starting research plan build at {start_time}")
+def _date_bucket() -> int:
+    """Index of the current Config.Cache.REPORT_DATE_BUCKET_HOURS window."""
+    return int(time.time() // (Config.Cache.REPORT_DATE_BUCKET_HOURS * 60 * 60))
 
-    # First, identify key entities in the research topic
-    entity_prompt = f"""Given the following research topic: [{research_topic}], identify the 3 most important entities (people, companies, organizations, products, etc.) that are central to this topic.  Entity can be a single word only!
-    
-Your response must be in JSON format with exactly three entities:
-{{
-    "entity1": "<first key entity>",
-    "entity2": "<second key entity>",
-    "entity3": "<third key entity>"
-}}
+def _step_report_key(step: str, search_term: str, entities: dict) -> str:
+    return cache_key("step_report", step, search_term, json.dumps(entities, sort_keys=True),
+                     _date_bucket(), getattr(default_model, "model_name", None))
 
-Your response must start with {{ and must be valid JSON. Do not include any explanatory text outside the JSON structure."""
-    
-    # Save the entity prompt
-    crewid = CrewID.get_crewid()
-    File.save_prompt(crewid, "entity_identification", entity_prompt)
-    
-    entity_response = default_model.invoke(entity_prompt)
-    entity_response = entity_response.content.strip()
-    entity_response = entity_response.replace("```json", "").replace("```", "")
-    logger.debug(f"Entity Response: {entity_response}")
-    
-    try:
-        entities_json = json.loads(entity_response)
-        logger.debug(f"Entities json: {entities_json}")
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing entities JSON: {e}")
-        logger.error(f"Raw response: {entity_response}")
-        
-        # Attempt to extract JSON from the response if it contains JSON-like content
-        import re
-        json_pattern = r'({.*})'
-        match = re.search(json_pattern, entity_response, re.DOTALL)
-        
-        if match:
-            try:
-                potential_json = match.group(1)
-                logger.debug(f"Attempting to parse extracted JSON: {potential_json}")
-                entities_json = json.loads(potential_json)
-                logger.debug(f"Successfully extracted and parsed JSON from response: {entities_json}")
-            except json.JSONDecodeError:
-                # If extraction fails, create a basic fallback entities
-                logger.error("Failed to extract valid JSON, using fallback entities")
-                entities_json = {
-                    "entity1": research_topic.split()[0] if research_topic.split() else "Topic",
-                    "entity2": research_topic.split()[1] if len(research_topic.split()) > 1 else "Research",
-                    "entity3": research_topic.split()[2] if len(research_topic.split()) > 2 else "Information"
-                }
-        else:
-            # If no JSON-like content is found, use the fallback entities
-            logger.error("No JSON-like content found in response, using fallback entities")
-            entities_json = {
-                "entity1": research_topic.split()[0] if research_topic.split() else "Topic",
-                "entity2": research_topic.split()[1] if len(research_topic.split()) > 1 else "Research",
-                "entity3": research_topic.split()[2] if len(research_topic.split()) > 2 else "Information"
-            }
-
-    research_plan_prompt=f"""Example of a topic and the suggested research plan:
+
+_RESEARCH_PLAN_EXAMPLES = """Example of a topic and the suggested research plan:
 I want a detailed report on all Israeli hostages held by Hamas in Gaza:
 (1) Find the exact number of Israeli hostages currently held by Hamas in Gaza.
 (2) Find the names and ages of each hostage.
@@ -124,7 +76,86 @@ Which animals are better dolphins or sharks?
 (3) Find information about the different personalities of dolphins and sharks.
 (4) Find information about the different health needs of dolphins and sharks.
 (5) Find information about the different training needs of dolphins and sharks.
-(6) Find information about the different costs of owning a dog or cat.
+(6) Find information about the different costs of owning a dog or cat."""
+
+_FALLBACK_RESEARCH_PLAN = {
+    "step1": "Research general information about the topic",
+    "step2": "Find specific details related to the main aspects",
+    "step3": "Explore practical applications or implications",
+    "step4": "Analyze different perspectives or approaches",
+    "step5": "Compile recommendations or conclusions"
+}
+
+
+def _fallback_entities(research_topic: str) -> dict:
+    words = research_topic.split()
+    return {
+        "entity1": words[0] if words else "Topic",
+        "entity2": words[1] if len(words) > 1 else "Research",
+        "entity3": words[2] if len(words) > 2 else "Information"
+    }
+
+
+def _parse_json_response(response: str, description: str, fallback):
+    """
+    Parses a JSON object out of an LLM response, tolerating code fences and surrounding text.
+
+    Args:
+        response (str): The raw model response
+        description (str): What is being parsed, for logging
+        fallback: Value returned if no valid JSON object can be found
+
+    Returns:
+        The parsed JSON object, or fallback
+    """
+    response = response.replace("```json", "").replace("```", "")
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing {description} JSON: {e}")
+        logger.error(f"Raw response: {response}")
+
+    # Attempt to extract JSON from the response if it contains JSON-like content
+    match = re.search(r'({.*})', response, re.DOTALL)
+    if match:
+        try:
+            potential_json = match.group(1)
+            logger.debug("Attempting to parse extracted JSON: %s", potential_json)
+            parsed = json.loads(potential_json)
+            logger.debug("Successfully extracted and parsed JSON from response")
+            return parsed
+        except json.JSONDecodeError:
+            logger.error(f"Failed to extract valid {description} JSON, using fallback")
+    else:
+        logger.error(f"No JSON-like content found in {description} response, using fallback")
+    return fallback
+
+
+async def _aidentify_entities(research_topic: str) -> dict:
+    """Planning node: the 3 key entities of the topic. Independent of the plan."""
+    entity_prompt = f"""Given the following research topic: [{research_topic}], identify the 3 most important entities (people, companies, organizations, products, etc.) that are central to this topic.  Entity can be a single word only!
+    
+Your response must be in JSON format with exactly three entities:
+{{
+    "entity1": "<first key entity>",
+    "entity2": "<second key entity>",
+    "entity3": "<third key entity>"
+}}
+
+Your response must start with {{ and must be valid JSON. Do not include any explanatory text outside the JSON structure."""
+    
+    entity_response = await llm.ainvoke(entity_prompt, "entity_identification")
+    logger.debug("Entity Response: %s", entity_response)
+    entities_json = _parse_json_response(entity_response, "entities", None)
+    if entities_json is None:
+        entities_json = _fallback_entities(research_topic)
+    logger.debug("Entities json: %s", entities_json)
+    return entities_json
+
+
+async def _agenerate_plan(research_topic: str) -> dict:
+    """Planning node: the research steps for the topic."""
+    research_plan_prompt=f"""{_RESEARCH_PLAN_EXAMPLES}
 
 Based on that, create a research plan for: {research_topic}
 
@@ -137,62 +168,22 @@ Your response must be in JSON format with step keys and descriptions:
 
 Your response must start with {{ and must be valid JSON. Do not include any explanatory text outside the JSON structure."""
 
-    # Save the research plan prompt
-    File.save_prompt(crewid, "research_plan_generation", research_plan_prompt)
-    
-    logger.debug(f"Prompt: {research_plan_prompt}")
-    research_plan_response=default_model.invoke(research_plan_prompt)
-    research_plan_response=research_plan_response.content.strip()
-    research_plan_response=research_plan_response.replace("```json","").replace("```","")
-    logger.debug(f"Response: {research_plan_response}")
+    logger.debug("Prompt: %s", research_plan_prompt)
+    research_plan_response=await llm.ainvoke(research_plan_prompt, "research_plan_generation")
+    logger.debug("Response: %s", research_plan_response)
+    return _parse_json_response(research_plan_response, "research plan", dict(_FALLBACK_RESEARCH_PLAN))
 
-    try:
-        research_plan_json = json.loads(research_plan_response)
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing research plan JSON: {e}")
-        logger.error(f"Raw response: {research_plan_response}")
-        
-        # Attempt to extract JSON from the response if it contains JSON-like content
-        import re
-        json_pattern = r'({.*})'
-        match = re.search(json_pattern, research_plan_response, re.DOTALL)
-        
-        if match:
-            try:
-                potential_json = match.group(1)
-                logger.debug(f"Attempting to parse extracted JSON: {potential_json}")
-                research_plan_json = json.loads(potential_json)
-                logger.debug("Successfully extracted and parsed JSON from response")
-            except json.JSONDecodeError:
-                # If extraction fails, create a basic fallback plan
-                logger.error("Failed to extract valid JSON, using fallback plan")
-                research_plan_json = {
-                    "step1": "Research general information about the topic",
-                    "step2": "Find specific details related to the main aspects",
-                    "step3": "Explore practical applications or implications",
-                    "step4": "Analyze different perspectives or approaches",
-                    "step5": "Compile recommendations or conclusions"
-                }
-        else:
-            # If no JSON-like content is found, use the fallback plan
-            logger.error("No JSON-like content found in response, using fallback plan")
-            research_plan_json = {
-                "step1": "Research general information about the topic",
-                "step2": "Find specific details related to the main aspects",
-                "step3": "Explore practical applications or implications",
-                "step4": "Analyze different perspectives or approaches",
-                "step5": "Compile recommendations or conclusions"
-            }
-    
-    # Generate search terms for each step in a single LLM call
-    search_terms = {}
+
+async def _agenerate_search_terms(research_plan_json: dict) -> dict:
+    """Planning node: a Google search term for each step of the plan, in a single LLM call."""
     steps_for_search = {}
     for step_key, step_value in research_plan_json.items():
         if step_key.startswith("step"):
             steps_for_search[step_key] = step_value
-    
-    if steps_for_search:
-        search_term_prompt = f"""For each of the following research steps, generate an appropriate Google search term.
+    if not steps_for_search:
+        return {}
+
+    search_term_prompt = f"""For each of the following research steps, generate an appropriate Google search term.
         
 {json.dumps(steps_for_search, indent=2)}
         
@@ -205,42 +196,87 @@ Respond in JSON format with the step keys and their corresponding search terms:
 
 Your response must start with {{ and must be valid JSON. Do not include any explanatory text outside the JSON structure."""
         
-        # Save the search term prompt
-        File.save_prompt(crewid, "search_term_generation", search_term_prompt)
-        
-        search_term_response = default_model.invoke(search_term_prompt)
-        search_terms_json = search_term_response.content.strip()
-        search_terms_json = search_terms_json.replace("```json", "").replace("```", "")
-        logger.debug(f"Generated search terms: {search_terms_json}")
+    search_terms_json = await llm.ainvoke(search_term_prompt, "search_term_generation")
+    logger.debug("Generated search terms: %s", search_terms_json)
+    return _parse_json_response(search_terms_json, "search terms", {})
+
+
+async def _afused_plan(research_topic: str):
+    """
+    Fused planning: plan, entities and search terms from one structured LLM call.
+
+    Returns:
+        dict with "plan", "entities" and "search_terms", or None if the response is unusable
+    """
+    fused_prompt = f"""{_RESEARCH_PLAN_EXAMPLES}
+
+Based on that, create a research plan for: {research_topic}
+
+Also identify the 3 most important entities (people, companies, organizations, products, etc.) that are central to this topic.  Entity can be a single word only!
+And for each research step, generate an appropriate Google search term.
+
+Your response must be in JSON format:
+{{
+    "entities": {{"entity1": "<first key entity>", "entity2": "<second key entity>", "entity3": "<third key entity>"}},
+    "plan": {{"step1": "First step description", "step2": "Second step description", ...}},
+    "search_terms": {{"step1": "search term for step 1", "step2": "search term for step 2", ...}}
+}}
+
+Your response must start with {{ and must be valid JSON. Do not include any explanatory text outside the JSON structure."""
+
+    fused_response = await llm.ainvoke(fused_prompt, "fused_research_plan")
+    fused = _parse_json_response(fused_response, "fused research plan", None)
+    if not isinstance(fused, dict) or not all(isinstance(fused.get(k), dict) for k in ("entities", "plan", "search_terms")):
+        logger.error("Fused research plan response is incomplete, falling back to the planning graph")
+        return None
+    if not any(k.startswith("step") for k in fused["plan"]):
+        logger.error("Fused research plan has no steps, falling back to the planning graph")
+        return None
+    return fused
+
+
+def build_research_plan(research_topic: str) -> dict:
+    """
+    Builds a research plan based on the given topic.
+    
+    Args:
+        research_topic (str): The topic to create a research plan for
         
-        try:
-            search_terms = json.loads(search_terms_json)
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing search terms JSON: {e}")
-            logger.error(f"Raw response: {search_terms_json}")
-            
-            # Attempt to extract JSON from the response if it contains JSON-like content
-            import re
-            json_pattern = r'({.*})'
-            match = re.search(json_pattern, search_terms_json, re.DOTALL)
-            
-            if match:
-                try:
-                    potential_json = match.group(1)
-                    logger.debug(f"Attempting to parse extracted JSON: {potential_json}")
-                    search_terms = json.loads(potential_json)
-                    logger.debug("Successfully extracted and parsed JSON from response")
-                except json.JSONDecodeError:
-                    # If extraction fails, create empty dict
-                    logger.error("Failed to extract valid JSON, using empty dict")
-                    search_terms = {}
-            else:
-                # If no JSON-like content is found, use empty dict
-                logger.error("No JSON-like content found in response, using empty dict")
-                search_terms = {}
+    Returns:
+        dict: A formatted research plan
+    """
+    return run_sync(abuild_research_plan(research_topic))
+
+async def abuild_research_plan(research_topic: str) -> dict:
+    """
+    Async implementation of build_research_plan.
+
+    Planning is a small dependency graph: entity identification and plan generation run
+    concurrently, and search-term generation starts as soon as the plan is ready. With
+    Config.PLANNING_MODE = "fused" a single structured call is tried first.
+    """
+    with track_stage("plan"):
+        return await _abuild_research_plan(research_topic)
+
+async def _abuild_research_plan(research_topic: str) -> dict:
+    start_time = datetime.now()
+    logger.debug("Starting research plan build at %s", start_time)
+
+    planned = None
+    if Config.PLANNING_MODE == "fused":
+        planned = await _afused_plan(research_topic)
+    if planned is None:
+        planned = await run_graph({
+            "entities": ((), lambda: _aidentify_entities(research_topic)),
+            "plan": ((), lambda: _agenerate_plan(research_topic)),
+            "search_terms": (("plan",), _agenerate_search_terms),
+        })
+
+    research_plan_json = planned["plan"]
+    entities_json = planned["entities"]
     
     # Add search terms to the research plan JSON
-    research_plan_json["search_terms"] = search_terms
+    research_plan_json["search_terms"] = planned["search_terms"]
     
     # Add entities and research topic to the research plan JSON
     research_plan_json["entities"] = entities_json
@@ -253,22 +289,22 @@ Your response must start with {{ and must be valid JSON. Do not include any expl
     # File.write_file(crewid, "research", "research_topic.txt", research_topic)
     
     # Save the research plan with entities
-    File.write_file(crewid, "", "research_plan.json", json.dumps(research_plan_json))
+    await asyncio.to_thread(File.write_file, crewid, "", "research_plan.json", json.dumps(research_plan_json))
     
     # # Save entities for later use in deep_sprint_topic
     # File.write_file(crewid, "research", "entities.json", json.dumps(entities_json))
     
-    logger.debug(f"Research plan: {research_plan_json}")
-    logger.debug(f"Entities: {entities_json}")
+    logger.debug("Research plan: %s", research_plan_json)
+    logger.debug("Entities: %s", entities_json)
 
     end_time = datetime.now()
     duration = end_time - start_time
-    logger.debug(f"Research plan build completed in {duration}")
+    logger.debug("Research plan build completed in %s", duration)
     
     # Return only the plan part, not the entire result object
     return research_plan_json
 
-def deep_sprint_topic(step: str, step_number: int, entities: dict, search_term: str = None) -> str:
+def deep_sprint_topic(step: str, step_number: int, entities: dict, search_term: str = None, on_chunk=None, checkpoint=None) -> str:
     """
     Executes a deep sprint on a specific topic.
     
@@ -277,12 +313,28 @@ def deep_sprint_topic(step: str, step_number: int, entities: dict, search_term:
         step_number (int): The step number
         entities (dict): The entities to use for the search
         search_term (str, optional): The search term to use. Defaults to None.
+        on_chunk (callable, optional): If given, the step report is streamed from the model
+            and on_chunk is called with each text chunk as it arrives. Defaults to None.
+        checkpoint (StepCheckpoint, optional): Where the step saves its search results, page
+            summaries and report as each is done. Stages found there are not redone. Defaults to None.
         
     Returns:
         str: The result of the deep sprint
     """
+    return run_sync(adeep_sprint_topic(step, step_number, entities, search_term, on_chunk, checkpoint))
+
+async def adeep_sprint_topic(step: str, step_number: int, entities: dict, search_term: str = None, on_chunk=None, checkpoint=None) -> str:
+    """Async implementation of deep_sprint_topic."""
+    with steps_in_flight.track_in_progress(), track_stage("step"):
+        return await _adeep_sprint_topic(step, step_number, entities, search_term, on_chunk, checkpoint)
+
+async def _adeep_sprint_topic(step: str, step_number: int, entities: dict, search_term: str, on_chunk, checkpoint) -> str:
     start_time = datetime.now()
-    logger.debug(f"Starting deep sprint for step {step_number} at {start_time}")
+    logger.debug("Starting deep sprint for step %s at %s", step_number, start_time)
+
+    if checkpoint is not None and checkpoint.report is not None:
+        logger.info(f"Step {step_number + 1} restored from checkpoint")
+        return checkpoint.report
     
     # Extract entities
     entity1 = entities.get("entity1", "")
@@ -293,38 +345,66 @@ def deep_sprint_topic(step: str, step_number: int, entities: dict, search_term:
     if not search_term:
         search_term = step
     
-    logger.debug(f"Using search term: {search_term}")
-    
-    # Optimize the search query
-    optimized_query = Search.optimize_query(search_term)
-    logger.debug(f"Optimized query: {optimized_query}")
-    
-    # Perform the search
-    search_results = Search.search(optimized_query, 40)
-    
-    # Extract URLs from search results
-    urls = []
-    for result in search_results:
-        if isinstance(result, dict) and 'link' in result:
-            urls.append(result['link'])
-        elif isinstance(result, str):
-            urls.append(result)
-    
-    logger.debug(f"Found {len(urls)} URLs")
+    logger.debug("Using search term: %s", search_term)
+
+    # An unchanged step (same text, search term, entities and model, same day) is not researched again
+    memo_key = _step_report_key(step, search_term, entities)
+    memoized = await asyncio.to_thread(_reports.get, memo_key)
+    cache_requests.inc(cache="step_reports", result="miss" if memoized is None else "hit")
+    if memoized is not None:
+        crewid = CrewID.get_crewid()
+        RunStats.incr(crewid, "steps_reused")
+        logger.info(f"Step {step_number + 1} unchanged, reusing its report")
+        await asyncio.to_thread(File.write_file, crewid, step_number, "step_report.html", memoized)
+        duration = str(datetime.now() - start_time)
+        if checkpoint is not None:
+            checkpoint.record_report(memoized, duration)
+        return {
+            'summary': memoized,
+            'execution_time': duration
+        }
+    
+    searched = checkpoint.search if checkpoint is not None else None
+    if searched is not None:
+        optimized_query, urls = searched
+    else:
+        # Optimize the search query
+        optimized_query = await Search.aoptimize_query(search_term)
+        logger.debug("Optimized query: %s", optimized_query)
+        
+        # Perform the search
+        search_results = await Search.asearch(optimized_query, 40)
+        
+        # Extract URLs from search results
+        urls = []
+        for result in search_results:
+            if isinstance(result, dict) and 'link' in result:
+                urls.append(result['link'])
+            elif isinstance(result, str):
+                urls.append(result)
+        if checkpoint is not None:
+            checkpoint.record_search(optimized_query, urls)
+    
+    logger.debug("Found %s URLs", len(urls))
     
     # Browse the URLs and extract content
     all_results = ""
     results_limit = 10
-    for i, url in enumerate(urls[:results_limit]):  # Limit to first 3 URLs for now
-        try:
-            logger.debug(f"Browsing URL {i+1}/{len(urls[:results_limit])}: {url}")
-            content = Browser.scrape_and_summarize_web_page(url)
-            if content and not ("Error scraping" in content):
-                all_results += f"\n\nSource {i+1} ({url}):\n{content}\n"
-            else:
-                logger.error(f"Error scraping URL {url}: {content}")
-        except Exception as e:
-            logger.error(f"Error browsing URL {url}: {e}")
+    logger.debug("Browsing up to %s of %s URLs with up to %s workers", results_limit, len(urls), Config.FETCH_WORKERS_PER_STEP)
+    # Pages are scraped and summarized concurrently; near-duplicates are skipped and their
+    # slots filled from the remaining search results. Results come back in source order.
+    contents = await Browser.ascrape_and_summarize_distinct_pages(
+        urls, results_limit, Config.FETCH_WORKERS_PER_STEP,
+        known_summaries=checkpoint.summaries if checkpoint is not None else None,
+        on_summary=checkpoint.record_summary if checkpoint is not None else None,
+    )
+    for i, (url, content) in enumerate(contents):
+        if isinstance(content, Exception):
+            logger.error(f"Error browsing URL {url}: {content}")
+        elif content and not ("Error scraping" in content):
+            all_results += f"\n\nSource {i+1} ({url}):\n{content}\n"
+        else:
+            logger.error(f"Error scraping URL {url}: {content}")
     
     if test_mode:
         topic_summary_response = f"""
@@ -346,12 +426,14 @@ Topic: {step}
 Key Entities: {entity1}, {entity2}, {entity3}
 Summary: {all_results}="""
 
-        # Save the topic summary prompt
-        crewid = CrewID.get_crewid()
-        File.save_prompt(crewid, f"step_{step_number}_summary", topic_summary_prompt)
-        
-        topic_summary_response=default_model.invoke(topic_summary_prompt)
-        topic_summary_response=topic_summary_response.content.strip()
+        if on_chunk is None:
+            topic_summary_response=await llm.ainvoke(topic_summary_prompt, f"step_{step_number}_summary")
+        else:
+            chunks = []
+            async for chunk in llm.astream(topic_summary_prompt, f"step_{step_number}_summary"):
+                chunks.append(chunk)
+                on_chunk(chunk)
+            topic_summary_response="".join(chunks).strip()
         topic_summary_response=topic_summary_response.replace("```html","").replace("```","")
     
     # Define the CSS style
@@ -366,11 +448,16 @@ Summary: {all_results}="""
     # Save individual step report
     crewid = CrewID.get_crewid()
     output_path = f"step_report.html"
-    File.write_file(crewid, step_number, output_path, topic_summary_response)
+    await asyncio.to_thread(File.write_file, crewid, step_number, output_path, topic_summary_response)
 
     end_time = datetime.now()
     duration = end_time - start_time
-    logger.debug(f"Step execution completed in {duration}")
+    logger.debug("Step execution completed in %s", duration)
+    if checkpoint is not None:
+        checkpoint.record_report(topic_summary_response, str(duration))
+    # A report written without any sources is not worth reusing
+    if all_results and not test_mode:
+        await asyncio.to_thread(_reports.set, memo_key, topic_summary_response)
     return {
         'summary': topic_summary_response,
         'execution_time': str(duration)
@@ -386,20 +473,91 @@ def generate_final_report(all_results: str) -> str:
     Returns:
         str: The final report
     """
-    today = date.today()
-    
-    # Get the research topic from the research plan file
+    return run_sync(agenerate_final_report(all_results))
+
+async def agenerate_final_report(all_results: str) -> str:
+    """Async implementation of generate_final_report."""
+    with track_stage("final_report"):
+        memo_key = await _afinal_report_key(all_results)
+        memoized = await asyncio.to_thread(_reports.get, memo_key)
+        cache_requests.inc(cache="final_reports", result="miss" if memoized is None else "hit")
+        if memoized is not None:
+            return await _areuse_final_report(memoized)
+        final_report_prompt = await _abuild_final_report_prompt(all_results)
+        final_report = await llm.ainvoke(final_report_prompt, "final_report")
+        final_report = await _afinish_final_report(final_report)
+        await asyncio.to_thread(_reports.set, memo_key, final_report)
+        return final_report
+
+def stream_final_report(all_results: str):
+    """
+    Generates the final report while streaming it as the model produces it.
+
+    Args:
+        all_results (str): All the results from the research steps
+
+    Yields:
+        dict: {'final_report_chunk': <raw text>} for each model chunk, then one
+              {'final_report': <full styled report>} once it has been persisted
+    """
+    return iterate_sync(astream_final_report(all_results))
+
+async def astream_final_report(all_results: str):
+    """Async implementation of stream_final_report."""
+    with track_stage("final_report"):
+        memo_key = await _afinal_report_key(all_results)
+        memoized = await asyncio.to_thread(_reports.get, memo_key)
+        cache_requests.inc(cache="final_reports", result="miss" if memoized is None else "hit")
+        if memoized is not None:
+            yield {'final_report': await _areuse_final_report(memoized)}
+            return
+        final_report_prompt = await _abuild_final_report_prompt(all_results)
+        chunks = []
+        async for chunk in llm.astream(final_report_prompt, "final_report"):
+            chunks.append(chunk)
+            yield {'final_report_chunk': chunk}
+        final_report = await _afinish_final_report("".join(chunks).strip())
+        await asyncio.to_thread(_reports.set, memo_key, final_report)
+        yield {'final_report': final_report}
+
+async def _aresearch_topic() -> str:
+    """Returns the topic saved with the run's research plan."""
     crewid = CrewID.get_crewid()
     research_topic = ""
     
     try:
-        research_plan_content = File.read_file(crewid, "", "research_plan.json")
+        research_plan_content = await asyncio.to_thread(File.read_file, crewid, "", "research_plan.json")
         if research_plan_content:
             research_plan = json.loads(research_plan_content)
             research_topic = research_plan.get("research_topic", "")
     except Exception as e:
         logger.error(f"Error retrieving research topic: {e}")
         research_topic = "Research Topic"  # Fallback if we can't get the actual topic
+    return research_topic
+
+async def _afinal_report_key(all_results: str) -> str:
+    """The final report only changes when the step results, the topic or the model do."""
+    research_topic = await _aresearch_topic()
+    return cache_key("final_report", content_digest(all_results), research_topic,
+                     _date_bucket(), getattr(default_model, "model_name", None))
+
+async def _areuse_final_report(final_report: str) -> str:
+    """Saves a previously generated final report as this run's final report."""
+    crewid = CrewID.get_crewid()
+    RunStats.incr(crewid, "final_reports_reused")
+    logger.info("Step results unchanged, reusing the final report")
+    await asyncio.to_thread(File.write_file, crewid, "final", "final_report.html", final_report, durable=True)
+    return final_report
+
+async def _abuild_final_report_prompt(all_results: str) -> str:
+    """Builds the final report prompt, addressing the topic saved with the research plan."""
+    today = date.today()
+    
+    # Get the research topic from the research plan file
+    research_topic = await _aresearch_topic()
+
+    # Oversized inputs are condensed first; inputs that fit go straight through
+    all_results = await _afit_results_to_budget(all_results, research_topic, Config.FINAL_REPORT_TOKEN_BUDGET)
     
 #     final_report_prompt=f"""Date: {today}.
 # Create a verbose, detailed executive summary in html from below content. Make sure to specifically address the topic: {research_topic}. Summarize key findings. You must include MOST of the details from the original content. Convert findings into charts, tables or structured bullet points  Add insights that can only be derived from looking at all of the content.  Present the information in a way that is easy to understand and use. Keep all citations.  Again, make sure to specifically address the topic: {research_topic}.
@@ -424,12 +582,10 @@ Format the report with:
 Data
 {all_results}"""
 
-    # Save the final report prompt
-    File.save_prompt(crewid, "final_report", final_report_prompt)
-    
-    final_report_response = default_model.invoke(final_report_prompt)
-    final_report = final_report_response.content.strip()
-    
+    return final_report_prompt
+
+async def _afinish_final_report(final_report: str) -> str:
+    """Cleans up and styles the model's final report, then saves it."""
     # Clean up the response
     final_report = final_report.replace("```html", "").replace("```", "")
     
@@ -439,7 +595,107 @@ Data
     final_report = css_style + final_report
     
     # Save the final report
-    File.write_file(crewid, "final", "final_report.html", final_report)
+    crewid = CrewID.get_crewid()
+    # The final report is the run's result: write it durably rather than queueing it
+    await asyncio.to_thread(File.write_file, crewid, "final", "final_report.html", final_report, durable=True)
     
     return final_report
 
+# Step results are concatenated as "\nStep N:\n<report>\n" (or "Step N Error:") by the caller
+_STEP_HEADER = re.compile(r'^Step (\d+)( Error)?:\n', re.MULTILINE)
+_MAX_REDUCE_TIERS = 4
+
+def _split_step_results(all_results: str) -> list:
+    """Splits the concatenated step results into per-step sections, dropping their CSS."""
+    sections = []
+    matches = list(_STEP_HEADER.finditer(all_results))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(all_results)
+        body = re.sub(r'<style>.*?</style>', '', all_results[match.end():end], flags=re.DOTALL).strip()
+        sections.append(f"{match.group(0)}{body}\n")
+    if not sections:
+        sections.append(re.sub(r'<style>.*?</style>', '', all_results, flags=re.DOTALL))
+    return sections
+
+def _batch_by_tokens(sections: list, budget: int) -> list:
+    """Groups consecutive sections into batches of at most budget tokens, at least two per batch."""
+    batches = []
+    batch, batch_tokens = [], 0
+    for section in sections:
+        tokens = estimate_tokens(section)
+        if len(batch) >= 2 and batch_tokens + tokens > budget:
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(section)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def _acondense_step_report(section: str, research_topic: str, budget: int) -> str:
+    """Map step: condenses one step report into compact findings."""
+    header = _STEP_HEADER.match(section)
+    name = f"final_report_map_step_{header.group(1)}" if header else "final_report_map"
+    condense_prompt = f"""Condense the research report below into compact findings for a final report on: "{research_topic}"
+
+Output a short HTML bulleted list (<ul><li>) of the key findings only. Keep every figure, date, name and citation (source URL) that supports a finding. Drop styling, repetition and filler.
+
+Report
+{truncate_to_tokens(section, budget)}"""
+    findings = await llm.ainvoke(condense_prompt, name)
+    heading = header.group(0) if header else ""
+    return f"{heading}{findings.replace('```html', '').replace('```', '').strip()}\n"
+
+async def _amerge_findings(batch: list, research_topic: str, tier: int, index: int) -> str:
+    """Reduce step: merges several groups of findings into one."""
+    merge_prompt = f"""Merge the research findings below into one compact HTML bulleted list for a final report on: "{research_topic}"
+
+Combine overlapping findings, keep every figure, date, name and citation (source URL), and note which step each finding came from.
+
+Findings
+{"".join(batch)}"""
+    merged = await llm.ainvoke(merge_prompt, f"final_report_reduce_{tier}_{index}")
+    return merged.replace("```html", "").replace("```", "").strip() + "\n"
+
+async def _afit_results_to_budget(all_results: str, research_topic: str, budget: int) -> str:
+    """
+    Fits the step results into the final report's token budget with map-reduce synthesis.
+
+    Inputs that fit are returned unchanged (the single-shot fast path). Otherwise every
+    step report is condensed in parallel, and the findings are merged in tiers of
+    budget-sized batches until they fit.
+
+    Args:
+        all_results (str): All the results from the research steps
+        research_topic (str): The topic the final report addresses
+        budget (int): Estimated token budget for the final report's data
+
+    Returns:
+        str: Results that fit the budget
+    """
+    tokens = estimate_tokens(all_results)
+    if tokens <= budget:
+        return all_results
+
+    sections = _split_step_results(all_results)
+    stripped = "".join(sections)
+    if estimate_tokens(stripped) <= budget:
+        logger.info(f"Final report input fits the budget of {budget} tokens once step CSS is dropped")
+        return stripped
+
+    logger.info(f"Final report input ~{tokens} tokens exceeds the budget of {budget}; condensing {len(sections)} step reports")
+    findings = list(await asyncio.gather(
+        *(_acondense_step_report(section, research_topic, budget) for section in sections)
+    ))
+
+    tier = 0
+    while len(findings) > 1 and estimate_tokens("".join(findings)) > budget and tier < _MAX_REDUCE_TIERS:
+        tier += 1
+        batches = _batch_by_tokens(findings, budget)
+        logger.info(f"Final report reduce tier {tier}: merging {len(findings)} findings in {len(batches)} batches")
+        findings = list(await asyncio.gather(
+            *(_amerge_findings(batch, research_topic, tier, i) for i, batch in enumerate(batches))
+        ))
+
+    # The cap guarantees the prompt fits even if the model did not condense enough
+    return truncate_to_tokens("".join(findings), budget)
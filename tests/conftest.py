@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Configuration is read from the environment at import time, so it is set before any
+# application module is imported: a model URL that is never called, and caches and
+# run output under a scratch directory instead of the working tree.
+_SCRATCH = Path(tempfile.mkdtemp(prefix="deepsprint-tests-"))
+os.environ.setdefault("LM_STUDIO_URL", "http://127.0.0.1:9/v1")
+os.environ.setdefault("CREWAI_TOOLS_ALLOW_UNSAFE_PATHS", "true")
+os.environ["CACHE_DIR"] = str(_SCRATCH / "cache")
+os.environ["RUN_LOG_FILES"] = "false"
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own directory, since output/ and prompts/ are relative to it."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
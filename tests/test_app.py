@@ -0,0 +1,17 @@
+from utils.crewid import CrewID
+
+
+def test_request_without_crewid_gets_a_fresh_one(monkeypatch):
+    import app
+
+    monkeypatch.setattr(CrewID, "crewid", "1111")
+    with app.app.test_request_context("/generate_pdf", method="POST", json={}):
+        first = app.request_crewid()
+    with app.app.test_request_context("/generate_pdf", method="POST", json={}):
+        second = app.request_crewid()
+    with app.app.test_request_context("/generate_pdf", method="POST", json={"crewid": "2222"}):
+        sent = app.request_crewid()
+
+    assert first != "1111" and second != "1111" and first != second
+    assert sent == "2222"
+    assert CrewID.crewid == "1111"
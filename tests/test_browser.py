@@ -0,0 +1,52 @@
+import asyncio
+
+from utils.capabilities import Browser as browser_module
+from utils.capabilities.Browser import Browser
+from utils.config import Config
+
+PREAMBLE = "The following text is scraped website content:\n\n"
+
+PAGES = {
+    "https://a.example/": "Error scraping https://a.example/: 403 Client Error: Forbidden for url " + "x" * 80,
+    "https://b.example/": PREAMBLE + "Please enable JavaScript.",
+    "https://c.example/": PREAMBLE + "Solar panel prices fell sharply in 2024 as module supply outgrew demand worldwide.",
+    "https://d.example/": PREAMBLE + "The river delta floods every spring, renewing the farmland with fresh silt deposits.",
+}
+
+
+def _scrape(monkeypatch, limit: int, adaptive: bool):
+    recorded = []
+
+    async def fetch(url):
+        return PAGES[url]
+
+    async def summarize(url, text):
+        return f"summary of {url}"
+
+    monkeypatch.setattr(Browser, "afetch_page_text", fetch)
+    monkeypatch.setattr(Browser, "asummarize_page_text", summarize)
+    monkeypatch.setattr(browser_module._FetchFailureRate, "overfetch_ratio", lambda: 0.0)
+    monkeypatch.setattr(browser_module._FetchFailureRate, "record",
+                        lambda attempts, failures: recorded.append((attempts, failures)))
+    results = asyncio.run(Browser.ascrape_and_summarize_distinct_pages(list(PAGES), limit, adaptive=adaptive))
+    return results, recorded
+
+
+def test_error_text_and_preamble_only_pages_are_failures(monkeypatch):
+    # A budget small enough that an error text counted as content would end the step
+    monkeypatch.setattr(Config, "FETCH_MIN_PAGES", 1)
+    monkeypatch.setattr(Config, "FETCH_CONTENT_BUDGET_CHARS", 100)
+
+    results, recorded = _scrape(monkeypatch, limit=2, adaptive=True)
+
+    assert [url for url, _ in results] == ["https://c.example/", "https://d.example/"]
+    assert recorded == [(4, 2)]
+
+
+def test_error_text_is_reported_not_summarized(monkeypatch):
+    results, _ = _scrape(monkeypatch, limit=4, adaptive=False)
+
+    by_url = dict(results)
+    assert by_url["https://a.example/"] == PAGES["https://a.example/"]
+    assert by_url["https://b.example/"].startswith("Unable to extract meaningful content")
+    assert by_url["https://c.example/"] == "summary of https://c.example/"
@@ -0,0 +1,45 @@
+import os
+import time
+
+from utils.cache import DiskCache, TieredCache
+
+
+def test_tiered_cache_promotion_keeps_entry_ttl(tmp_path):
+    cache = TieredCache("promotion", memory_bytes=1024)
+    cache.disk = DiskCache("promotion", path=tmp_path / "promotion.sqlite3")
+    cache.set("k", "v", ttl=1)
+    cache.memory.clear()
+
+    assert cache.get("k") == "v"  # promoted from disk
+    time.sleep(1.5)
+    assert cache.get("k") is None
+
+
+def test_disk_cache_entries_expire_after_their_ttl(tmp_path):
+    cache = DiskCache("ttl", ttl=60, path=tmp_path / "ttl.sqlite3")
+    cache.set("default", "kept")
+    cache.set("short", "dropped", ttl=0.2)
+    time.sleep(0.3)
+
+    assert cache.get("default") == "kept"
+    assert cache.get("short") is None
+
+
+def test_disk_cache_evicts_least_recently_used_entries(tmp_path):
+    value = os.urandom(512).hex()  # barely compressible, so every entry has about the same size
+    cache = DiskCache("lru", path=tmp_path / "lru.sqlite3")
+    cache.set("probe", value)
+    size = cache.get_entry("probe").size
+    cache.delete("probe")
+
+    cache.max_bytes = int(size * 2.5)
+    for key in ("a", "b"):
+        cache.set(key, key + value)
+        time.sleep(0.01)
+    cache.get("a")  # now more recently used than "b"
+    time.sleep(0.01)
+    cache.set("c", "c" + value)
+
+    assert cache.get("a") == "a" + value
+    assert cache.get("b") is None
+    assert cache.get("c") == "c" + value
@@ -0,0 +1,65 @@
+from concurrent.futures import Future
+
+import pytest
+
+from utils.checkpoint import RunInProgressError, RunManifest
+
+STEPS = {"step1": "History of tidal power", "step2": "Current tidal projects"}
+TERMS = {"step1": "tidal power history", "step2": "tidal projects 2026"}
+
+
+def _interrupted_run(crewid: str) -> None:
+    manifest = RunManifest.start(crewid, STEPS, {}, TERMS)
+    manifest.step("step1").record_search("tidal power history", ["https://a.example/"])
+    manifest.step("step1").record_report("Step one report", "1.0s")
+    manifest.step("step2").record_report("Step two report", "1.0s")
+    manifest.finish("interrupted")
+
+
+def test_finished_run_is_written_out_and_no_longer_live():
+    _interrupted_run("6001")
+
+    assert not RunManifest.is_live("6001")
+    manifest = RunManifest.load("6001")
+    assert manifest._data["status"] == "interrupted"
+    assert manifest.step("step1").report == {"summary": "Step one report", "execution_time": "1.0s"}
+
+
+def test_resume_keeps_unchanged_steps_and_drops_edited_ones():
+    _interrupted_run("6002")
+    steps = dict(STEPS, step2="Planned tidal projects")
+
+    manifest = RunManifest.start("6002", steps, {}, TERMS, resume=True)
+
+    assert manifest.step("step1").report["summary"] == "Step one report"
+    assert manifest.step("step1").search == ("tidal power history", ["https://a.example/"])
+    assert manifest.step("step2").report is None
+    manifest.finish("complete")
+
+
+def test_starting_without_resume_drops_all_checkpoints():
+    _interrupted_run("6003")
+
+    manifest = RunManifest.start("6003", STEPS, {}, TERMS)
+
+    assert manifest.step("step1").report is None
+    manifest.finish("complete")
+
+
+def test_a_live_run_cannot_be_started_again():
+    manifest = RunManifest.start("6004", STEPS, {}, TERMS)
+    with pytest.raises(RunInProgressError):
+        RunManifest.start("6004", STEPS, {}, TERMS, resume=True)
+    manifest.finish("interrupted")
+
+
+def test_run_stays_live_until_its_steps_are_done():
+    manifest = RunManifest.start("6005", STEPS, {}, TERMS)
+    step = Future()
+    manifest.finish("interrupted", [step])
+    assert RunManifest.is_live("6005")
+
+    step.set_result(None)
+
+    assert not RunManifest.is_live("6005")
+    assert RunManifest.load("6005")._data["status"] == "interrupted"
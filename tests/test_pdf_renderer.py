@@ -0,0 +1,17 @@
+from utils import pdf_renderer
+from utils.pdf_renderer import PdfRenderer
+
+
+def test_failed_job_that_is_never_polled_expires(monkeypatch):
+    def fail(html, dest):
+        raise RuntimeError("broken template")
+
+    monkeypatch.setattr(pdf_renderer.pisa, "CreatePDF", fail)
+    renderer = PdfRenderer(workers=1, cache_bytes=1024, job_ttl=0)
+    job_id = renderer.submit("<p>report</p>", "Report")
+    renderer._jobs[job_id].exception()  # wait for the render to fail
+
+    renderer.submit("<p>other report</p>", "Report")  # prunes expired jobs
+
+    assert job_id not in renderer._jobs
+    assert renderer.result(job_id) == ("unknown", None)
@@ -0,0 +1,12 @@
+from utils.prompt_log import PromptLog
+
+
+def test_numbering_continues_after_the_log_is_evicted(monkeypatch):
+    monkeypatch.setattr(PromptLog._next_seq, "max_entries", 1)
+    PromptLog.append("4244", "plan", "prompt", "first")
+    PromptLog.append("4245", "plan", "prompt", "other run")  # evicts 4244
+    PromptLog.append("4244", "plan", "response", "second")
+
+    assert [entry["seq"] for entry in PromptLog.entries("4244")] == [0, 1]
+    assert PromptLog.read("4244", 1)["text"] == "second"
+    assert len(PromptLog._next_seq) == 1
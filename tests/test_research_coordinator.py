@@ -0,0 +1,17 @@
+import asyncio
+import json
+
+import research_coordinator
+from utils.capabilities.File import File
+from utils.run_context import run_context
+from utils.writer import artifact_writer
+
+
+def test_research_topic_is_read_from_the_saved_plan():
+    crewid = "4242"
+    with run_context(crewid):
+        File.write_file(crewid, "", "research_plan.json", json.dumps({"research_topic": "Tidal energy"}))
+        artifact_writer.flush(crewid)
+
+        assert (File.OUTPUT_DIR / crewid / "_research_plan.json").exists()
+        assert asyncio.run(research_coordinator._aresearch_topic()) == "Tidal energy"
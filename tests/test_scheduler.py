@@ -0,0 +1,77 @@
+import asyncio
+
+from utils.scheduler import _Limit
+
+
+async def _hold(limit: _Limit, name: str, order: list, release: asyncio.Event = None):
+    await limit.acquire()
+    order.append(name)
+    try:
+        if release is not None:
+            await release.wait()
+        else:
+            await asyncio.sleep(0)
+    finally:
+        limit.release()
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def scenario():
+        limit = _Limit("test", 1)
+        order = []
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limit, "holder", order, release))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(_hold(limit, name, order)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        assert limit.queued == 2
+
+        release.set()
+        await holder
+        # The slot went to "a" as is: a newcomer now queues behind the waiters
+        assert limit.in_flight == 1
+        late = asyncio.create_task(_hold(limit, "late", order))
+        await asyncio.gather(*waiters, late)
+        return limit, order
+
+    limit, order = asyncio.run(scenario())
+    assert order == ["holder", "a", "b", "late"]
+    assert (limit.in_flight, limit.queued) == (0, 0)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limit = _Limit("test", 1)
+        await limit.acquire()
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        assert limit.queued == 1
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert (limit.in_flight, limit.queued) == (1, 0)
+        limit.release()
+        return limit
+
+    limit = asyncio.run(scenario())
+    assert (limit.in_flight, limit.queued) == (0, 0)
+
+
+def test_waiter_cancelled_after_hand_over_passes_the_slot_on():
+    async def scenario():
+        limit = _Limit("test", 1)
+        order = []
+        await limit.acquire()
+        cancelled = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        next_waiter = asyncio.create_task(_hold(limit, "next", order))
+        await asyncio.sleep(0)
+
+        limit.release()  # hands the slot to the first waiter...
+        cancelled.cancel()  # ...which is cancelled before it runs
+        await asyncio.gather(cancelled, next_waiter, return_exceptions=True)
+        return limit, order
+
+    limit, order = asyncio.run(scenario())
+    assert order == ["next"]
+    assert (limit.in_flight, limit.queued) == (0, 0)
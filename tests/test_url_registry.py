@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from utils.run_stats import RunStats
+from utils.url_registry import UrlRegistry
+
+
+def test_work_runs_once_and_every_caller_gets_its_result():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "summary"
+
+    async def scenario():
+        return await asyncio.gather(*(UrlRegistry.single_flight("5001", "summary", "https://a.example/", work)
+                                      for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ["summary"] * 3
+    assert calls == [1]
+    assert RunStats.get("5001")["summaries_saved"] == 2
+    UrlRegistry.clear("5001")
+
+
+def test_an_exception_reaches_every_caller():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("unreachable page")
+
+    async def scenario():
+        return await asyncio.gather(*(UrlRegistry.single_flight("5002", "fetch", "https://a.example/", work)
+                                      for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    UrlRegistry.clear("5002")
+
+
+def test_a_waiter_takes_over_from_a_cancelled_owner():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def scenario():
+        owner = asyncio.create_task(UrlRegistry.single_flight("5003", "fetch", "https://a.example/", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(UrlRegistry.single_flight("5003", "fetch", "https://a.example/", work))
+        await asyncio.sleep(0)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(scenario()) == "page"
+    assert calls == [1, 1]
+    UrlRegistry.clear("5003")
+
+
+def test_clear_forgets_a_run():
+    async def work():
+        return "page"
+
+    asyncio.run(UrlRegistry.single_flight("5004", "fetch", "https://a.example/", work))
+    UrlRegistry.clear("5004")
+
+    assert "5004" not in UrlRegistry._runs
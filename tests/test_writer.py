@@ -0,0 +1,15 @@
+import shutil
+
+from utils.writer import artifact_writer
+
+
+def test_write_recreates_a_deleted_run_directory(workdir):
+    path = workdir / "output" / "4243" / "_notes.txt"
+    artifact_writer.write("4243", path, "first")
+    artifact_writer.flush("4243")
+    shutil.rmtree(path.parent)
+
+    artifact_writer.write("4243", path, "second")
+    artifact_writer.flush("4243")
+
+    assert path.read_text(encoding="utf-8") == "second"
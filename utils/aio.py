@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+
+import httpx
+
+from utils.config import Config
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+# One event loop per process drives all async research I/O. Synchronous callers
+# (Flask request threads, step pool threads) submit coroutines to it with run_sync.
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_http_client = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use."""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="research-loop", daemon=True)
+            _loop_thread.start()
+            logger.debug("Started shared research event loop")
+        return _loop
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on the shared event loop and block until it finishes.
+    This is what keeps the synchronous API a thin wrapper over the async one.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the research event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), loop).result()
+
+
+async def _in_context(coro, context: contextvars.Context):
+    """
+    Await coro with the caller's context variables (e.g. the active run) applied.
+    Tasks on the loop thread otherwise start from the loop thread's own context.
+    """
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def iterate_sync(agen):
+    """
+    Iterate an async generator on the shared event loop from synchronous code.
+    Items are handed over as soon as they are produced. Closing the returned
+    generator early cancels the async one.
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def _pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except Exception as e:
+            items.put((done, e))
+        else:
+            items.put((done, None))
+
+    future = asyncio.run_coroutine_threadsafe(_in_context(_pump(), contextvars.copy_context()), get_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled keep-alive HTTP client shared by all coroutines on the loop."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_connections=Config.HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=Config.HTTP_MAX_CONNECTIONS),
+        )
+    return _http_client
+
+
+async def run_graph(nodes: dict) -> dict:
+    """
+    Run a small dependency graph of coroutine functions, independent nodes concurrently.
+
+    Args:
+        nodes: Maps a node name to (dependencies, fn). fn is called with the results of its
+               dependencies as positional arguments, in order, and must return an awaitable.
+
+    Returns:
+        Dict mapping each node name to its result
+    """
+    for name, (deps, _) in nodes.items():
+        missing = [dep for dep in deps if dep not in nodes]
+        if missing:
+            raise ValueError(f"Graph node '{name}' depends on unknown nodes: {missing}")
+
+    tasks = {}
+
+    async def _run(name):
+        deps, fn = nodes[name]
+        args = [await tasks[dep] for dep in deps]
+        return await fn(*args)
+
+    # Tasks only start at the next await, so every dependency exists before any node runs
+    for name in nodes:
+        tasks[name] = asyncio.ensure_future(_run(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return {name: task.result() for name, task in tasks.items()}
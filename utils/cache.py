@@ -0,0 +1,243 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+from utils.config import Config
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+# expires: absolute expiry time (time.time()), or None if the entry never expires
+CacheEntry = namedtuple("CacheEntry", ["value", "digest", "created", "size", "expires"])
+
+
+def cache_key(*parts) -> str:
+    """
+    Build a stable cache key from arbitrary parts.
+
+    Args:
+        *parts: Values that identify the cached item (converted with str())
+
+    Returns:
+        A sha256 hex digest of the joined parts
+    """
+    joined = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha256(joined.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def content_digest(text: str) -> str:
+    """Return the sha256 hex digest of a text value."""
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache bounded by entry count and, optionally, total size."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set(self, key, value, size: int = None) -> None:
+        """Store a value. size defaults to len(value) for str/bytes values and 1 otherwise."""
+        if size is None:
+            size = len(value) if isinstance(value, (str, bytes)) else 1
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+class DiskCache:
+    """
+    SQLite-backed text cache. Values are stored zlib-compressed together with their
+    sha256 digest and creation time. Entries expire after their TTL, and once the
+    stored size exceeds max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, name: str, ttl: float = None, max_bytes: int = None, path: Path = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.path = Path(path) if path else Config.Path.CACHE_DIR / f"{name}.sqlite3"
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    digest TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    expires REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        except sqlite3.Error as e:
+            # A cache that cannot be opened must never break the research pipeline
+            logger.error(f"Disk cache '{name}' disabled, could not open {self.path}: {e}")
+            self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def get_entry(self, key: str):
+        """Return the CacheEntry for key, or None if it is missing or expired."""
+        if self._conn is None:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, digest, created, size, expires FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, digest, created, size, expires = row
+                if expires is not None and expires <= now:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    return None
+                self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            return CacheEntry(zlib.decompress(value).decode("utf-8", errors="surrogatepass"), digest, created, size, expires)
+        except (sqlite3.Error, zlib.error) as e:
+            logger.error(f"Disk cache '{self.name}' read failed: {e}")
+            return None
+
+    def get(self, key: str, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry.value
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        """Store a text value. ttl overrides the cache default for this entry."""
+        if self._conn is None:
+            return
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires = now + ttl if ttl else None
+        raw = value.encode("utf-8", errors="surrogatepass")
+        blob = zlib.compress(raw)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, digest, size, created, accessed, expires) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, blob, hashlib.sha256(raw).hexdigest(), len(blob), now, now, expires),
+                )
+                self._evict(now)
+        except sqlite3.Error as e:
+            logger.error(f"Disk cache '{self.name}' write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used ones until under max_bytes."""
+        self._conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        logger.debug("Disk cache '%s' evicted %s entries (%s bytes)", self.name, len(stale), freed)
+
+
+class TieredCache:
+    """
+    Two-tier text cache: a size-accounted in-memory LRUCache in front of a DiskCache.
+    Disk hits are promoted into memory.
+    """
+
+    def __init__(self, name: str, memory_bytes: int, disk_bytes: int = None, ttl: float = None):
+        self.name = name
+        self.memory = LRUCache(max_entries=1_000_000, max_bytes=memory_bytes)
+        self.disk = DiskCache(name, ttl=ttl, max_bytes=disk_bytes)
+        # Memory entries carry their own expiry so a TTL also holds for the first tier
+        self._ttl = ttl
+
+    def get(self, key: str, default=None):
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires is None or expires > time.time():
+                return value
+            self.memory.pop(key)
+        disk_entry = self.disk.get_entry(key)
+        if disk_entry is None:
+            return default
+        # The promoted copy expires with the disk entry, whose TTL may have been set per entry
+        self.memory.set(key, (disk_entry.value, disk_entry.expires), size=len(disk_entry.value))
+        return disk_entry.value
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        ttl = self._ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        self.memory.set(key, (value, expires), size=len(value))
+        self.disk.set(key, value, ttl=ttl)
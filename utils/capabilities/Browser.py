@@ -1,5 +1,19 @@
 from utils.capabilities.Text import TextUtils
 from utils.capabilities.Search import logger
+from utils.config import Config
+from utils.cache import DiskCache
+from utils.crewid import CrewID
+from utils.metrics import cache_requests, failures, fetch_seconds
+from utils.run_stats import RunStats
+from utils.scheduler import scheduler
+from utils.utils import normalize_url
+from utils.aio import run_sync
+from utils.fingerprint import NearDuplicateIndex, page_fingerprint
+from utils.url_registry import UrlRegistry
+import asyncio
+import math
+import threading
+import time
 import logging
 
 # Completely disable all logs from _base_client.py
@@ -13,26 +27,135 @@ tool = ScrapeWebsiteTool()
 # selenium_tool = SeleniumScrapingTool()
 counter:int=0
 sites_scrapped:list[str]=[]
+_stats_lock = threading.Lock()
+
+# Extracted page text, keyed by normalized URL, so related runs don't re-download pages
+_page_cache = DiskCache("pages", ttl=Config.Cache.PAGE_TTL, max_bytes=Config.Cache.PAGE_MAX_BYTES)
+
+class _FetchFailureRate:
+    """
+    Running (exponentially weighted) share of fetched pages that turn out unusable,
+    persisted across runs. Adaptive fetching over-fetches by this rate.
+    """
+
+    _store = DiskCache("fetch_stats")
+    _lock = threading.Lock()
+    _rate = None
+    _WEIGHT = 0.2  # weight of the newest observation
+    _MAX_OVERFETCH = 1.0  # never fetch more than twice the open slots ahead
+
+    @staticmethod
+    def rate() -> float:
+        with _FetchFailureRate._lock:
+            if _FetchFailureRate._rate is None:
+                _FetchFailureRate._rate = float(_FetchFailureRate._store.get("failure_rate", 0.2))
+            return _FetchFailureRate._rate
+
+    @staticmethod
+    def overfetch_ratio() -> float:
+        """Extra fetches per open slot so that, at the observed failure rate, the slots still fill."""
+        rate = _FetchFailureRate.rate()
+        return min(rate / (1 - rate), _FetchFailureRate._MAX_OVERFETCH) if rate < 1 else _FetchFailureRate._MAX_OVERFETCH
+
+    @staticmethod
+    def record(attempts: int, failures: int) -> None:
+        rate = _FetchFailureRate.rate()
+        with _FetchFailureRate._lock:
+            rate = (1 - _FetchFailureRate._WEIGHT) * rate + _FetchFailureRate._WEIGHT * failures / attempts
+            _FetchFailureRate._rate = rate
+        _FetchFailureRate._store.set("failure_rate", repr(rate))
+        logger.debug("Fetch failure rate now %.2f (%s of %s failed this step)", rate, failures, attempts)
+
+# The scrape tool prefixes every page with this line; it is not page content
+_SCRAPE_PREAMBLE = "The following text is scraped website content:"
+_MIN_CONTENT_CHARS = 50
+
+
+def _content_length(text: str) -> int:
+    """Length of scraped text without the scrape tool's preamble."""
+    if text.startswith(_SCRAPE_PREAMBLE):
+        text = text[len(_SCRAPE_PREAMBLE):]
+    return len(text.strip())
+
+
+def _is_fetch_error(text: str) -> bool:
+    """The scrape tool may report a failed fetch as an "Error scraping" text instead of raising."""
+    return bool(text) and "Error scraping" in text
+
+
+def _record_visit(url: str) -> int:
+    global counter
+    with _stats_lock:
+        sites_scrapped.append(url)
+        counter += 1
+        return counter
 
 class Browser:
     def get_stats()->str:
         global sites_scrapped
         global counter
-        return f"Scraped {counter}\nsites: {sites_scrapped} "
+        stats = RunStats.get(CrewID.get_crewid())
+        return (f"Scraped {counter}\nsites: {sites_scrapped} "
+                f"\npage cache: {stats.get('page_cache_hits', 0)} hits, {stats.get('page_cache_misses', 0)} misses")
+
+    def fetch_page_text(url: str) -> str:
+        """
+        Return the extracted text of a page, served from the page cache when possible.
+        Only meaningful content (50+ characters) is cached. Scraping errors propagate.
+        """
+        return run_sync(Browser.afetch_page_text(url))
+
+    async def afetch_page_text(url: str) -> str:
+        """Async counterpart of fetch_page_text. A page is fetched at most once per run."""
+        key = normalize_url(url)
+        crewid = CrewID.get_crewid()
+        return await UrlRegistry.single_flight(crewid, "fetch", key, lambda: Browser._afetch_page_text(url, key, crewid))
+
+    async def _afetch_page_text(url: str, key: str, crewid: str) -> str:
+        entry = await asyncio.to_thread(_page_cache.get_entry, key)
+        if entry is not None:
+            RunStats.incr(crewid, "page_cache_hits")
+            cache_requests.inc(cache="pages", result="hit")
+            logger.debug("Page cache hit for %s (fetched at %s, sha256 %s)", url, entry.created, entry.digest[:12])
+            return entry.value
+
+        RunStats.incr(crewid, "page_cache_misses")
+        cache_requests.inc(cache="pages", result="miss")
+        # Page fetches are capped process-wide by the scheduler (Config.FETCH_WORKERS_PER_PROCESS).
+        # The scrape tool is blocking (and validates every URL and redirect), so it runs on a worker thread.
+        async with scheduler.aslot("fetch"):
+            # text=selenium_tool._run(website_url=url)
+            started = time.perf_counter()
+            try:
+                text = await asyncio.to_thread(tool._run, website_url=url)
+            except Exception:
+                fetch_seconds.observe(time.perf_counter() - started, status="error")
+                failures.inc(stage="fetch")
+                raise
+        # The scrape tool does not expose the HTTP status. Failures may come back as an
+        # "Error scraping" message instead of raising, and unusable pages come back short.
+        if _is_fetch_error(text):
+            status = "error"
+            failures.inc(stage="fetch")
+        else:
+            status = "ok" if text and _content_length(text) >= _MIN_CONTENT_CHARS else "empty"
+        fetch_seconds.observe(time.perf_counter() - started, status=status)
+        if status == "ok":
+            await asyncio.to_thread(_page_cache.set, key, text)
+        return text
     
     def browse(url: str) -> str:
-        global counter
-        global sites_scrapped
-        sites_scrapped.append(url)
-        counter+=1
-        logger.debug(f"Scraping number {counter}: Attempting to open URL: {url}")
+        return run_sync(Browser.abrowse(url))
+
+    async def abrowse(url: str) -> str:
+        counter = _record_visit(url)
+        logger.debug("Scraping number %s: Attempting to open URL: %s", counter, url)
         
         try:
-            # text=selenium_tool._run(website_url=url)
-            text = tool._run(website_url=url)
+            text = await Browser.afetch_page_text(url)
             
             # Check if the scraped text is empty or too short
-            if not text or len(text) < 50:
+            if not text or _content_length(text) < _MIN_CONTENT_CHARS:
                 logger.warning(f"Scraped content from {url} is too short or empty: {text}")
                 return f"Unable to extract meaningful content from {url}. The page might be protected, require JavaScript, or contain no accessible text content."
                 
@@ -48,29 +171,184 @@ class Browser:
         """
         Open a url and return a detailed summary of its content.
         """
-        global counter
-        global sites_scrapped
-        sites_scrapped.append(url)
-        counter+=1
-        logger.debug(f"Scraping number {counter}: Attempting to open URL: {url}")
+        return run_sync(Browser.ascrape_and_summarize_web_page(url))
+
+    async def ascrape_and_summarize_web_page(url: str) -> str:
+        """Async counterpart of scrape_and_summarize_web_page."""
+        counter = _record_visit(url)
+        logger.debug("Scraping number %s: Attempting to open URL: %s", counter, url)
         
         try:
-            # text=selenium_tool._run(website_url=url)
-            text = tool._run(website_url=url)
+            text = await Browser.afetch_page_text(url)
             
             # Check if the scraped text is empty or too short
-            if not text or len(text) < 50:
+            if not text or _content_length(text) < _MIN_CONTENT_CHARS:
                 logger.warning(f"Scraped content from {url} is too short or empty: {text}")
                 return f"Unable to extract meaningful content from {url}. The page might be protected, require JavaScript, or contain no accessible text content."
                 
             # logger.debug(f"Raw scraping: {text}")
-            summarized_text = TextUtils.perform_task(text, "Create a concise summary of the provided content. Do not miss out on any fact/detail. Keep links, dates in tact.")
-            logger.debug(f"Summarized text final length: {len(summarized_text)} characters")
-            # logger.debug(f"\\nn--------------------------------------------------\nSummary: {summarized_text}\n---------------------------\n\n")
-
-            return summarized_text.replace("'","&#39;")
+            return await Browser.asummarize_page_text(url, text)
             
         except Exception as e:
             error_message = f"Error scraping {url}: {str(e)}"
             logger.error(error_message)
-            return error_message
\ No newline at end of file
+            return error_message
+
+    async def asummarize_page_text(url: str, text: str) -> str:
+        """Summarize the already extracted text of a page. A page is summarized at most once per run."""
+        return await UrlRegistry.single_flight(CrewID.get_crewid(), "summary", normalize_url(url),
+                                               lambda: Browser._asummarize_page_text(text))
+
+    async def _asummarize_page_text(text: str) -> str:
+        summarized_text = await TextUtils.aperform_task(text, "Create a concise summary of the provided content. Do not miss out on any fact/detail. Keep links, dates in tact.")
+        logger.debug("Summarized text final length: %s characters", len(summarized_text))
+        # logger.debug(f"\\nn--------------------------------------------------\nSummary: {summarized_text}\n---------------------------\n\n")
+
+        return summarized_text.replace("'","&#39;")
+
+    def scrape_and_summarize_distinct_pages(urls: list[str], limit: int, max_workers: int = None, adaptive: bool = None,
+                                            known_summaries: dict = None, on_summary=None) -> list:
+        """
+        Scrape ranked urls and summarize up to limit of them, skipping near-duplicate pages
+        (syndicated copies, mirrors, AMP versions) before they reach the LLM. A skipped
+        page's slot goes to the next url in the ranking.
+
+        In adaptive mode failed pages are skipped as well, a few extra urls are fetched
+        ahead based on the failure rate seen so far, and fetching stops early once the
+        content budget is met or the deadline passes. Outstanding fetches are then cancelled.
+
+        Args:
+            urls: Candidate urls, best ranked first
+            limit: How many pages to summarize at most
+            max_workers: How many urls of this call are processed at once. Defaults to Config.FETCH_WORKERS_PER_STEP.
+            adaptive: Use adaptive fetching. Defaults to Config.ADAPTIVE_FETCH.
+            known_summaries: Summaries made earlier for some of the urls (e.g. restored from a
+                run checkpoint), by url. Those pages are fetched for de-duplication only.
+            on_summary: Called with (url, summary) for every new summary.
+
+        Returns:
+            (url, result) pairs in ranking order. A result is the summary string or an
+            error/notice string for a page that could not be used.
+        """
+        return run_sync(Browser.ascrape_and_summarize_distinct_pages(urls, limit, max_workers, adaptive, known_summaries, on_summary))
+
+    async def ascrape_and_summarize_distinct_pages(urls: list[str], limit: int, max_workers: int = None, adaptive: bool = None,
+                                                   known_summaries: dict = None, on_summary=None) -> list:
+        """Async counterpart of scrape_and_summarize_distinct_pages."""
+        crewid = CrewID.get_crewid()
+        adaptive = Config.ADAPTIVE_FETCH if adaptive is None else adaptive
+        width = asyncio.Semaphore(max(1, max_workers or Config.FETCH_WORKERS_PER_STEP))
+        seen = NearDuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+        kept = []  # (url, summary task or error string)
+        good_chars = 0
+        attempts = failures = 0
+        # The failure rate is read from SQLite on first use, so it is loaded off the event loop
+        overfetch = await asyncio.to_thread(_FetchFailureRate.overfetch_ratio) if adaptive else 0.0
+        deadline = asyncio.get_running_loop().time() + Config.FETCH_DEADLINE_SECONDS if adaptive else None
+
+        async def _fetch(url: str):
+            async with width:
+                counter = _record_visit(url)
+                logger.debug("Scraping number %s: Attempting to open URL: %s", counter, url)
+                return await Browser.afetch_page_text(url)
+
+        async def _summarize(url: str, text: str):
+            if known_summaries and url in known_summaries:
+                return known_summaries[url]
+            async with width:
+                summary = await Browser.asummarize_page_text(url, text)
+            if on_summary is not None:
+                on_summary(url, summary)
+            return summary
+
+        def _budget_met() -> bool:
+            if len(kept) >= limit:
+                return True
+            return adaptive and len(kept) >= Config.FETCH_MIN_PAGES and good_chars >= Config.FETCH_CONTENT_BUDGET_CHARS
+
+        async def _decide(url: str, fetch: asyncio.Task):
+            nonlocal good_chars, attempts, failures
+            attempts += 1
+            error = fetch.exception()
+            text = None if error else fetch.result()
+            if error or _is_fetch_error(text) or not text or _content_length(text) < _MIN_CONTENT_CHARS:
+                failures += 1
+                if error:
+                    message = f"Error scraping {url}: {str(error)}"
+                    logger.error(message)
+                elif _is_fetch_error(text):
+                    message = text
+                    logger.error(message)
+                else:
+                    logger.warning(f"Scraped content from {url} is too short or empty: {text}")
+                    message = f"Unable to extract meaningful content from {url}. The page might be protected, require JavaScript, or contain no accessible text content."
+                # Adaptive mode gives the slot of a failed page to the next url
+                if not adaptive:
+                    kept.append((url, message))
+                return
+            fingerprint = await asyncio.to_thread(page_fingerprint, text)
+            duplicate_of = seen.find(fingerprint)
+            if duplicate_of is not None:
+                RunStats.incr(crewid, "near_duplicates_skipped")
+                logger.info(f"Skipping {url}: near-duplicate of {duplicate_of}")
+                return
+            seen.add(fingerprint, url)
+            good_chars += _content_length(text)
+            # Summaries start right away, while the remaining urls are fetched
+            kept.append((url, asyncio.ensure_future(_summarize(url, text))))
+
+        fetches = {}  # ranking position -> fetch task
+        next_fetch = next_decision = 0
+        try:
+            while not _budget_met():
+                # Keep enough fetches in flight to fill the open slots, plus the learned over-fetch
+                wanted = math.ceil((limit - len(kept)) * (1 + overfetch))
+                while next_fetch < len(urls) and next_fetch - next_decision < wanted:
+                    fetches[next_fetch] = asyncio.ensure_future(_fetch(urls[next_fetch]))
+                    next_fetch += 1
+                if next_decision == next_fetch:
+                    break  # ranking exhausted
+
+                # Decide in ranking order, so the best ranked copy of a page is the one kept
+                pending = fetches[next_decision]
+                if not pending.done():
+                    timeout = None if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+                    await asyncio.wait([pending], timeout=timeout)
+                    if not pending.done():
+                        logger.info(f"Fetch deadline of {Config.FETCH_DEADLINE_SECONDS}s reached with {len(kept)} of {limit} pages")
+                        RunStats.incr(crewid, "fetch_deadlines_hit")
+                        # Still use the pages that did arrive, in ranking order
+                        for position in range(next_decision, next_fetch):
+                            if _budget_met():
+                                break
+                            if fetches[position].done():
+                                await _decide(urls[position], fetches[position])
+                        break
+                await _decide(urls[next_decision], pending)
+                next_decision += 1
+        finally:
+            outstanding = [fetch for fetch in fetches.values() if not fetch.done()]
+            for fetch in outstanding:
+                fetch.cancel()
+            if outstanding:
+                RunStats.incr(crewid, "fetches_cancelled", len(outstanding))
+                logger.debug("Cancelled %s outstanding fetches", len(outstanding))
+                await asyncio.gather(*outstanding, return_exceptions=True)
+            # Fetches that finished unexamined (e.g. after the deadline) must not warn as unretrieved
+            for fetch in fetches.values():
+                if fetch.done() and not fetch.cancelled():
+                    fetch.exception()
+
+        if adaptive and attempts:
+            await asyncio.to_thread(_FetchFailureRate.record, attempts, failures)
+
+        results = []
+        for url, result in kept:
+            if isinstance(result, asyncio.Future):
+                try:
+                    result = await result
+                except Exception as e:
+                    result = f"Error scraping {url}: {str(e)}"
+                    logger.error(result)
+            results.append((url, result))
+        return results
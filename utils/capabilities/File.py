@@ -3,9 +3,15 @@ import json
 import unicodedata
 import logging
 from utils.utils import clean_emoji
+from utils.run_context import OUTPUT_DIR, PROMPTS_DIR, RunContext, current_run
+from utils.writer import artifact_writer
+from utils.prompt_log import PromptLog
+from utils.catalog import run_catalog
 
 
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import List
 
@@ -15,58 +21,100 @@ logger = logging.getLogger(__name__)
 class File:
     """Util for file operations."""
 
-    OUTPUT_DIR = Path("./output")
+    OUTPUT_DIR = OUTPUT_DIR
     CREWS_DIR = Path("./crews")
-    PROMPTS_DIR = Path("./prompts")
+    PROMPTS_DIR = PROMPTS_DIR
 
-    CREWID_OUTPUT_DIR = None  # Initialize as None
-    CREWID_PROMPTS_DIR = None
+    # Names of written or queued files per output directory, so name probing needs no disk
+    # access. Only the most recently used directories are kept; others are read again.
+    _taken_names = OrderedDict()  # directory -> set of names, least recently used first
+    _names_lock = threading.Lock()
+    _MAX_NAME_DIRECTORIES = 64
 
-    @classmethod
-    def _ensure_directories(cls, crewid=None) -> None:
-        """Ensure input and output directories exist."""
-        cls.CREWID_OUTPUT_DIR = Path.joinpath(cls.OUTPUT_DIR, crewid)
-        cls.CREWID_PROMPTS_DIR = Path.joinpath(cls.PROMPTS_DIR, crewid)
-        logger.debug(f"CREWID_DIR: {cls.CREWID_OUTPUT_DIR}")
+    @staticmethod
+    def _ensure_directories(crewid: str) -> RunContext:
+        """
+        Ensure the run's output and prompts directories exist. Paths come from the active
+        run context when it is for crewid, and are never stored on the class, so
+        concurrent runs cannot write into each other's folders.
+        """
+        run = current_run()
+        if run is None or run.crewid != crewid:
+            run = RunContext.for_crewid(crewid)
+        logger.debug("CREWID_DIR: %s", run.output_dir)
+
+        # Created once per run; later calls only check an in-memory set
+        artifact_writer.ensure_dir(File.OUTPUT_DIR)
+        artifact_writer.ensure_dir(run.output_dir)
+        artifact_writer.ensure_dir(run.prompts_dir)
+        return run
 
-        cls.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        cls.CREWID_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        cls.CREWID_PROMPTS_DIR.mkdir(parents=True, exist_ok=True)
-        logger.debug(f"Ensured directories exist")
+    @staticmethod
+    def _claim_path(directory: Path, first_name: str, name: str, ext: str) -> Path:
+        """Reserve the first free file name in directory: first_name, then name_1ext, name_2ext, ..."""
+        with File._names_lock:
+            taken = File._taken_names.get(directory)
+            if taken is None:
+                taken = set(os.listdir(directory)) if directory.exists() else set()
+                # Writes queued before the directory was evicted may not be on disk yet
+                taken |= artifact_writer.pending_names(directory)
+                File._taken_names[directory] = taken
+                while len(File._taken_names) > File._MAX_NAME_DIRECTORIES:
+                    File._taken_names.popitem(last=False)
+            else:
+                File._taken_names.move_to_end(directory)
+            candidate = first_name
+            counter = 0
+            while candidate in taken:
+                counter += 1
+                candidate = f"{name}_{counter}{ext}"
+            taken.add(candidate)
+        return directory / candidate
 
     @staticmethod
     def save_prompt(crew_id: str, prompt_name: str, prompt_content: str) -> str:
         """
-        Save a prompt to a text file in the prompts/crewid/ folder.
+        Save a prompt to the run's prompt log (prompts/crewid/prompts.jsonl.gz).
+        The append is queued on the artifact writer and lands in the background.
         
         Args:
             crew_id: The crew ID to use for the folder path
-            prompt_name: The name of the prompt (used for the filename)
+            prompt_name: The name of the prompt
             prompt_content: The content of the prompt to save
             
         Returns:
             A string indicating success or failure
         """
         try:
-            File._ensure_directories(crew_id)
-            
-            # Create a filename with timestamp to avoid overwriting
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{prompt_name}_{timestamp}.txt"
-            
-            file_path = Path.joinpath(File.CREWID_PROMPTS_DIR, filename)
-            
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(prompt_content)
-                
-            logger.debug(f"Saved prompt to {file_path}")
-            return f"Successfully saved prompt to {file_path}"
+            PromptLog.append(crew_id, prompt_name, "prompt", prompt_content)
+            logger.debug("Queued prompt %s", prompt_name)
+            return f"Successfully saved prompt {prompt_name}"
             
         except Exception as e:
             logger.error(f"Error saving prompt: {str(e)}")
             return f"Error saving prompt: {str(e)}"
 
+    @staticmethod
+    def save_response(crew_id: str, prompt_name: str, response_content: str) -> str:
+        """
+        Save the model's response to a prompt to the run's prompt log, next to the prompt.
+        
+        Args:
+            crew_id: The crew ID to use for the folder path
+            prompt_name: The name of the prompt that was answered
+            response_content: The response text
+            
+        Returns:
+            A string indicating success or failure
+        """
+        try:
+            PromptLog.append(crew_id, prompt_name, "response", response_content)
+            return f"Successfully saved response to {prompt_name}"
+            
+        except Exception as e:
+            logger.error(f"Error saving response: {str(e)}")
+            return f"Error saving response: {str(e)}"
+
     @staticmethod
     def read_file(crew_id: str, step_number: str, filename: str) -> str:
         """
@@ -81,15 +129,18 @@ class File:
             The content of the file as a string
         """
         try:
-            File._ensure_directories(crew_id)
+            run = File._ensure_directories(crew_id)
             
-            # Construct the file path
-            if step_number:
-                file_path = Path.joinpath(File.CREWID_OUTPUT_DIR, f"{step_number}_{filename}")
-            else:
-                file_path = Path.joinpath(File.CREWID_OUTPUT_DIR, filename)
+            # Construct the file path the way write_file does, which prefixes the step
+            # number even when it is empty (e.g. "_research_plan.json")
+            file_path = Path.joinpath(run.output_dir, f"{step_number}_{filename}")
             
-            logger.debug(f"Reading file from: {file_path}")
+            logger.debug("Reading file from: %s", file_path)
+
+            # A queued write that has not landed yet is the current content
+            content = artifact_writer.pending(file_path)
+            if content is not None:
+                return content
             
             # Read the file
             with open(file_path, 'r', encoding='utf-8') as file:
@@ -105,22 +156,22 @@ class File:
             return ""
 
     @staticmethod
-    def write_file(crew_id: str, step_number: str, filename: str, _content: str) -> str:
+    def write_file(crew_id: str, step_number: str, filename: str, _content: str, durable: bool = False) -> str:
         """
         Write content to file in output directory. Handles html, txt, md, and json files.
         If file exists, append a counter to filename.
+
+        The write is queued on the artifact writer unless durable is set, in which case
+        the file is on disk (fsynced) when this returns. Once the file is written it is
+        recorded in the run catalog.
         """
-        logger.debug(f"Starting write_file with filename: {filename}")
+        logger.debug("Starting write_file with filename: %s", filename)
 
-        File._ensure_directories(crew_id)
+        run = File._ensure_directories(crew_id)
 
         # Split filename into name and extension
         name, ext = os.path.splitext(filename)
-        counter = 0
 
-        file_path = Path.joinpath(File.CREWID_OUTPUT_DIR, f"{step_number}_{filename}")
-
-        logger.debug(f"Starting write_file with filename: {file_path}")
         content=""
         if "html" in ext:
             # Normalize the string to replace no-break spaces with regular spaces
@@ -148,40 +199,37 @@ class File:
                 # If invalid JSON, proceed with the original content
 
         # Keep incrementing counter until we find an available filename
-        while file_path.exists():
-            counter += 1
-            new_filename = f"{name}_{counter}{ext}"
-            file_path = File.CREWID_OUTPUT_DIR / new_filename
-            logger.debug(f"File exists, trying: {file_path}")
-
-        logger.debug(f"Final file path: {file_path}")
+        file_path = File._claim_path(run.output_dir, f"{step_number}_{filename}", name, ext)
+        logger.debug("Final file path: %s", file_path)
 
         try:
             content = clean_emoji(content)  # Make sure this returns a string!
 
-            # Determine the appropriate file mode and error handling
+            # Determine the appropriate error handling
             if "html" in ext:
-                mode = 'w'
                 errors = 'xmlcharrefreplace'
             elif "json" in ext:
-                mode = 'w'
                 errors = 'strict'  # Strict JSON encoding
             else:  # For txt and md
-                mode = 'w'
                 errors = 'surrogatepass'
 
-            logger.debug(f"\n\n\n==================================================================================================\n==================== FILE TOOL SAVING FILE ==================================\n=======================================")
-            logger.debug(f"file_path:{file_path}")
-            logger.debug(f"original content:{_content}")
-            logger.debug(f"escaped content:{content}")
-            with open(file_path, mode, encoding='utf-8', errors=errors) as file:
-                file.write(_content)
-                logger.debug(f"Wrote content to file: {file_path}")
-            logger.debug(f"==================== FILE TOOL SUCCESS!  ==================================\n=============================================================================\n\n\n")
+            if durable:
+                artifact_writer.write_now(file_path, _content, errors)
+                run_catalog.record_artifact(crew_id, step_number, filename, file_path, _content)
+                logger.debug("Wrote content to file: %s", file_path)
+            else:
+                artifact_writer.write(crew_id, file_path, _content, errors)
+                # Queued behind the write, so the catalog never lists a file that is not on disk yet
+                artifact_writer.submit(
+                    crew_id,
+                    lambda: run_catalog.record_artifact(crew_id, step_number, filename, file_path, _content),
+                    f"catalog entry for {file_path}",
+                )
+                logger.debug("Queued content for file: %s", file_path)
             return f"Successfully wrote to {file_path}"
 
         except (UnicodeEncodeError) as e:
-            logger.debug(f"File Tool: Error writing to file '{file_path}': {str(e)}")
+            logger.debug("File Tool: Error writing to file '%s': %s", file_path, e)
             return f"FileTool: Error writing to file '{file_path}': {str(e)}"
 
     # @staticmethod
@@ -4,19 +4,25 @@ Contains classes for conversation management, LLM interactions, file operations,
 """
 
 # Standard library imports
+import asyncio
 from datetime import datetime
 import json
 import os
 import re
 from utils.logger_config import setup_logger
-from utils.config import default_model
+from utils.config import Config
+from utils.scheduler import scheduler
+from utils import llm
+from utils.aio import run_sync, get_http_client
+from utils.cache import LRUCache, DiskCache, TieredCache, cache_key
 
 # Third-party imports
-import requests
 # from crewai_tools import DallETool
 from dotenv import load_dotenv
 import logging
 from utils.crewid import CrewID
+from utils.metrics import cache_requests, failures, search_seconds
+from utils.run_stats import RunStats
 from utils.capabilities.File import File
 
 
@@ -29,8 +35,80 @@ load_dotenv()
 
 import re
 
+# Optimized queries, keyed on the normalized input query. Optimized outputs are also
+# recorded under their own key so that re-optimizing them is a no-op.
+_optimized_queries = LRUCache(max_entries=Config.Cache.QUERY_MEMORY_ENTRIES)
+_optimized_queries_store = DiskCache("optimized_queries") if Config.Cache.PERSIST_QUERIES else None
+
+# Boolean OR between quoted or grouped terms marks a query that was already optimized
+_OPTIMIZED_QUERY_OPERATOR = re.compile(r'\bOR\b')
+_OPTIMIZED_QUERY_GROUPING = re.compile(r'["(]')
+
+# Serper JSON responses, shared across steps, retries and users
+_serper_responses = TieredCache("serper_responses",
+                                memory_bytes=Config.Cache.SEARCH_MEMORY_BYTES,
+                                disk_bytes=Config.Cache.SEARCH_MAX_BYTES)
+
 class Search:
     """Utils for web searching and content retrieval."""
+
+    @staticmethod
+    async def _aserper_post(endpoint: str, query: str, num: int, tbs: str = None) -> dict:
+        """
+        POST a query to a Serper endpoint ("search" or "news") and return the JSON response.
+        Requests go through the shared pooled keep-alive HTTP client, and successful
+        responses are cached for Config.Cache.SEARCH_TTL[endpoint] seconds.
+        """
+        # Serper only treats upper-case OR/AND as operators, so those keep their case
+        normalized = " ".join(t if t in ("OR", "AND") else t.lower() for t in query.split())
+        key = cache_key(endpoint, normalized, num, tbs)
+        cached = await asyncio.to_thread(_serper_responses.get, key)
+        crewid = CrewID.get_crewid()
+        if cached is not None:
+            RunStats.incr(crewid, "search_cache_hits")
+            cache_requests.inc(cache="search", result="hit")
+            logger.debug("Serper %s cache hit for '%s'", endpoint, query)
+            return json.loads(cached)
+        RunStats.incr(crewid, "search_cache_misses")
+        cache_requests.inc(cache="search", result="miss")
+
+        payload = {'q': query, 'num': num}
+        if tbs:
+            payload['tbs'] = tbs
+        headers = {
+            'X-API-KEY': os.getenv("SERPER_API_KEY", ""),
+            'Content-Type': 'application/json'
+        }
+        async with scheduler.aslot("search"):
+            try:
+                with search_seconds.time(endpoint=endpoint):
+                    response = await get_http_client().post(f"{Config.SERPER_BASE_URL}/{endpoint}", headers=headers, content=json.dumps(payload))
+            except Exception:
+                failures.inc(stage="search")
+                raise
+        data = response.json()
+        if response.is_success:
+            await asyncio.to_thread(_serper_responses.set, key, json.dumps(data), Config.Cache.SEARCH_TTL.get(endpoint))
+        else:
+            failures.inc(stage="search")
+            logger.warning(f"Serper {endpoint} returned {response.status_code}: {response.text}")
+        return data
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalize a query for cache lookups: trimmed, lowercased, single-spaced."""
+        return " ".join(query.split()).lower()
+
+    @staticmethod
+    def _is_optimized_query(query: str) -> bool:
+        """
+        Returns True if the query already has the shape optimize_query produces,
+        or is a known optimize_query output.
+        """
+        key = Search._normalize_query(query)
+        if _optimized_queries.get(key) == query:
+            return True
+        return bool(_OPTIMIZED_QUERY_OPERATOR.search(query) and _OPTIMIZED_QUERY_GROUPING.search(query))
     
     @staticmethod
     def _save_search_log(query, optimized_query=None, blend_ratio=None, results=None, search_type="standard", file_path=None):
@@ -92,7 +170,40 @@ class Search:
     def optimize_query(query: str) -> str:
         """
         Optimizes the search query by removing common stop words and phrases.
+        Already-optimized queries are returned unchanged, and each distinct query is sent
+        to the LLM at most once (results are memoized in-process and, optionally, on disk).
         """
+        return run_sync(Search.aoptimize_query(query))
+
+    @staticmethod
+    async def aoptimize_query(query: str) -> str:
+        """Async counterpart of optimize_query."""
+        if Search._is_optimized_query(query):
+            logger.debug("Query already optimized, passing through: %s", query)
+            return query
+
+        key = Search._normalize_query(query)
+        optimized_query = _optimized_queries.get(key)
+        if optimized_query is None and _optimized_queries_store is not None:
+            optimized_query = await asyncio.to_thread(_optimized_queries_store.get, key)
+            if optimized_query is not None:
+                _optimized_queries.set(key, optimized_query)
+        if optimized_query is not None:
+            logger.debug("Optimized query cache hit for: %s", query)
+            return optimized_query
+
+        optimized_query = await Search._aoptimize_query_with_llm(query)
+
+        # Remember the result under the input query and under itself
+        for cache_key in (key, Search._normalize_query(optimized_query)):
+            _optimized_queries.set(cache_key, optimized_query)
+            if _optimized_queries_store is not None:
+                await asyncio.to_thread(_optimized_queries_store.set, cache_key, optimized_query)
+        return optimized_query
+
+    @staticmethod
+    async def _aoptimize_query_with_llm(query: str) -> str:
+        """Ask the LLM for an optimized version of the query."""
         prompt=f"""Example of research:
 Provide a comprehensive overview of mindtrip.ai, including its founding, mission, and business model.
 
@@ -106,12 +217,7 @@ Your response must be is json:
 
 Your response must start with {{"""
 
-        # Save the search optimization prompt
-        crewid = CrewID.get_crewid()
-        File.save_prompt(crewid, "search_optimization", prompt)
-        
-        response = default_model.invoke(prompt)
-        query_json=response.content.strip()
+        query_json = await llm.ainvoke(prompt, "search_optimization")
 
         query_json=query_json.replace("```json","").replace("```","")
         # logger.debug(f"Query json: {query_json}")
@@ -164,38 +270,32 @@ Your response must start with {{"""
         Returns:
             Formatted search results
         """
-        logger.debug(f"Starting search for '{_query}' with limit {limit} and time range {time_range}")
+        return run_sync(Search.asearch(_query, limit, time_range))
+
+    @staticmethod
+    async def asearch(_query: str, limit: int = 10, time_range: str = "24h") -> list:
+        """Async counterpart of search."""
+        logger.debug("Starting search for '%s' with limit %s and time range %s", _query, limit, time_range)
 
-        query=Search.optimize_query(_query)
-        logger.debug(f"Optimized search query: {query} -inurl:pdf")
+        query=await Search.aoptimize_query(_query)
+        logger.debug("Optimized search query: %s -inurl:pdf", query)
 
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({
-            'q': query,
-            'num': limit #put limit to accept the requestors limit
-        })
-        headers = {
-            'X-API-KEY': os.getenv("SERPER_API_KEY"),
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(url, headers=headers, data=payload)
-        # logger.debug(f"Search API call Response: {response.text}")
-        results = response.json().get('organic', [])
+        data = await Search._aserper_post("search", query, limit) #put limit to accept the requestors limit
+        results = data.get('organic', [])
         # logger.debug(f"Results: {results}")
         formatted_results = []
         for result in results:
             # Only add the link if it exists and is not empty
             if 'link' in result and result['link']:
                 formatted_results.append(result["link"])
-                logger.debug(f"Link result: {result['link']}")
+                logger.debug("Link result: %s", result['link'])
         
         # Check if we have any valid results
-        if not formatted_results and 'organic' in response.json():
-            logger.warning(f"No valid links found in search results. Raw results: {response.json()['organic']}")
+        if not formatted_results and 'organic' in data:
+            logger.warning(f"No valid links found in search results. Raw results: {data['organic']}")
         
         # Log search results to file
-        Search._save_search_log(_query, query, results=formatted_results, search_type="standard")
+        await asyncio.to_thread(Search._save_search_log, _query, query, results=formatted_results, search_type="standard")
         
         # logger.debug(f"Formatted results: {formatted_results}")
         logger.debug("Search is done")
@@ -214,20 +314,14 @@ Your response must start with {{"""
         Returns:
             Formatted news results
         """
-        query=Search.optimize_query(_query)
-        url = "https://google.serper.dev/news"
-        payload = json.dumps({
-            "q": query,
-            "num": 20, #put limit to respect the requestors limit
-            "tbs": Search._get_tbs(time_range)
-        })
-        headers = {
-            'X-API-KEY': os.getenv("SERPER_API_KEY"),
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(url, headers=headers, data=payload)
-        results = response.json().get('news', [])
+        return run_sync(Search.asearch_news(_query, limit, time_range))
+
+    @staticmethod
+    async def asearch_news(_query: str, limit: int = 5, time_range: str = "24h") -> list:
+        """Async counterpart of search_news."""
+        query=await Search.aoptimize_query(_query)
+        data = await Search._aserper_post("news", query, 20, Search._get_tbs(time_range)) #put limit to respect the requestors limit
+        results = data.get('news', [])
         
         formatted_results = []
         for result in results:
@@ -236,8 +330,8 @@ Your response must start with {{"""
                 formatted_results.append(result['link'])
         
         # Check if we have any valid results
-        if not formatted_results and 'news' in response.json():
-            logger.warning(f"No valid links found in news results. Raw results: {response.json()['news']}")
+        if not formatted_results and 'news' in data:
+            logger.warning(f"No valid links found in news results. Raw results: {data['news']}")
             
         return formatted_results
 
@@ -254,11 +348,16 @@ Your response must start with {{"""
         Returns:
             Formatted search results with higher accuracy
         """
-        logger.debug(f"Starting smart search for '{query}' with limit {limit} and time range {time_range}")
+        return run_sync(Search.asmart_search(query, limit, time_range))
+
+    @staticmethod
+    async def asmart_search(query: str, limit: int = 10, time_range: str = "24h") -> list:
+        """Async counterpart of smart_search."""
+        logger.debug("Starting smart search for '%s' with limit %s and time range %s", query, limit, time_range)
         
         # Step 1: Optimize the query
         optimized_query = query#Search.optimize_query(query)
-        logger.debug(f"Optimized search query: {optimized_query}")
+        logger.debug("Optimized search query: %s", optimized_query)
         
         # # Step 2: Get relevant sites and appropriate time range
         # relevant_sites, suggested_time_range = Search.get_relevant_sites(query)
@@ -269,23 +368,12 @@ Your response must start with {{"""
         
         # Step 3: Enhance query with relevant sites
         enhanced_query = f"{optimized_query}"
-        logger.debug(f"Enhanced query with relevant sites: {enhanced_query}")
+        logger.debug("Enhanced query with relevant sites: %s", enhanced_query)
         
         # Step 4: Execute the search with enhanced parameters
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({
-            'q': enhanced_query,
-            'num': limit * 2  # Request more results to filter down to higher quality ones
-            
-        })
-        headers = {
-            'X-API-KEY': os.getenv("SERPER_API_KEY"),
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(url, headers=headers, data=payload)
-        logger.debug(f"Search API call Response: {response.text}")
-        results = response.json().get('organic', [])
+        # Request more results to filter down to higher quality ones
+        data = await Search._aserper_post("search", enhanced_query, limit * 2)
+        results = data.get('organic', [])
         
         # Step 5: Filter and score results based on quality indicators
         scored_results = []
@@ -339,7 +427,7 @@ Your response must start with {{"""
         scored_results.sort(key=lambda x: x['score'])
         
         # Log detailed search results to file
-        Search._save_search_log(query, enhanced_query, results=scored_results, search_type="smart")
+        await asyncio.to_thread(Search._save_search_log, query, enhanced_query, results=scored_results, search_type="smart")
         
         # Extract just the links from the top results up to the requested limit
         formatted_results = [result["link"] for result in scored_results[:limit]]
@@ -348,9 +436,9 @@ Your response must start with {{"""
         if not formatted_results:
             logger.warning(f"No valid links found in smart search results.")
             # Fall back to regular search if smart search yields no results
-            return Search.search(query, limit, time_range)
+            return await Search.asearch(query, limit, time_range)
         
-        logger.debug(f"Smart search formatted results: {formatted_results}")
+        logger.debug("Smart search formatted results: %s", formatted_results)
         logger.debug("Smart search completed")
         return formatted_results
 
@@ -422,7 +510,7 @@ Your response must start with {{"""
         Returns:
             Blended list of search results optimized for accuracy and comprehensiveness
         """
-        logger.debug(f"Starting blended search for '{query}' with limit {limit}")
+        logger.debug("Starting blended search for '%s' with limit %s", query, limit)
         # Enhance search query with key entities
         entity1 = entities.get("entity1", "")
         entity2 = entities.get("entity2", "")
@@ -435,7 +523,7 @@ Your response must start with {{"""
             # If blend_ratio is None, empty, or missing required keys, determine it automatically
             blend_ratio = Search._determine_blend_ratio(query)
             
-        logger.debug(f"Using blend ratio: {blend_ratio}")
+        logger.debug("Using blend ratio: %s", blend_ratio)
         
         # Step 2: Calculate how many results to get from each source
         total_ratio = sum(blend_ratio.values())
@@ -450,7 +538,7 @@ Your response must start with {{"""
             max_source = max(source_limits, key=source_limits.get)
             source_limits[max_source] -= 1
             
-        logger.debug(f"Source limits: {source_limits}")
+        logger.debug("Source limits: %s", source_limits)
         
         # Step 3: Gather results from each source
         all_results = []
@@ -484,7 +572,7 @@ Your response must start with {{"""
         # Step 5: Return just the links, limited to the requested number
         formatted_results = [result['link'] for result in unique_results[:limit]]
         
-        logger.debug(f"Blended search returned {len(formatted_results)} unique results")
+        logger.debug("Blended search returned %s unique results", len(formatted_results))
         return formatted_results
 
 def main():
@@ -1,6 +1,21 @@
-from utils.config import default_model
+import asyncio
+import logging
+from utils.config import default_model, Config
 from utils.crewid import CrewID
-from utils.capabilities.File import File
+from utils.cache import TieredCache, cache_key, content_digest
+from utils.metrics import cache_requests, summarization_tokens
+from utils.run_stats import RunStats
+from utils import llm
+from utils.aio import run_sync
+from utils.tokens import estimate_tokens, split_to_tokens, truncate_to_tokens
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+# LLM task results, so already-processed content never goes back to the model
+_task_results = TieredCache("task_results",
+                            memory_bytes=Config.Cache.SUMMARY_MEMORY_BYTES,
+                            disk_bytes=Config.Cache.SUMMARY_MAX_BYTES)
 
 class TextUtils:
     """Not a tool. Summarize text using LLM."""
@@ -8,7 +23,48 @@ class TextUtils:
     @staticmethod
     def perform_task(text: str, task: str) -> str:
         """This is NOT a tool.  Run an LLM task on the provided text."""
-        prompt = f"""
+        return run_sync(TextUtils.aperform_task(text, task))
+
+    @staticmethod
+    async def aperform_task(text: str, task: str) -> str:
+        """Async counterpart of perform_task."""
+        crewid = CrewID.get_crewid()
+        key = cache_key(content_digest(text), task, getattr(default_model, "model_name", None))
+        result = await asyncio.to_thread(_task_results.get, key)
+        if result is not None:
+            RunStats.incr(crewid, "summary_cache_hits")
+            cache_requests.inc(cache="summaries", result="hit")
+            logger.debug("Task result cache hit (%s input characters)", len(text))
+            return result
+        RunStats.incr(crewid, "summary_cache_misses")
+        cache_requests.inc(cache="summaries", result="miss")
+
+        # Cap oversized inputs deterministically, then split what is left into chunks
+        input_tokens = estimate_tokens(text)
+        summarization_tokens.observe(input_tokens, direction="input")
+        if input_tokens > Config.TEXT_TASK_MAX_TOKENS:
+            logger.info(f"Text task input of ~{input_tokens} tokens capped at {Config.TEXT_TASK_MAX_TOKENS}")
+            RunStats.incr(crewid, "text_inputs_capped")
+            text = truncate_to_tokens(text, Config.TEXT_TASK_MAX_TOKENS)
+
+        chunks = split_to_tokens(text, Config.TEXT_TASK_CHUNK_TOKENS)
+        if len(chunks) == 1:
+            result = await llm.ainvoke(TextUtils._task_prompt(text, task), "text_processing")
+        else:
+            logger.debug("Text task input split into %s chunks", len(chunks))
+            RunStats.incr(crewid, "text_chunks", len(chunks))
+            partials = await asyncio.gather(
+                *(llm.ainvoke(TextUtils._task_prompt(chunk, task), "text_processing_chunk") for chunk in chunks)
+            )
+            result = await llm.ainvoke(TextUtils._merge_prompt(partials, task), "text_processing_merge")
+
+        summarization_tokens.observe(estimate_tokens(result), direction="output")
+        await asyncio.to_thread(_task_results.set, key, result)
+        return result
+
+    @staticmethod
+    def _task_prompt(text: str, task: str) -> str:
+        return f"""
 Here is a text:
 {text}
 
@@ -19,9 +75,18 @@ Your goal is to perform this task:
 
 Answer:"""
 
-        # Save the text processing prompt
-        crewid = CrewID.get_crewid()
-        File.save_prompt(crewid, "text_processing", prompt)
-        
-        response = default_model.invoke(prompt)
-        return response.content.strip()
\ No newline at end of file
+    @staticmethod
+    def _merge_prompt(partials: list, task: str) -> str:
+        parts = "\n\n".join(f"Part {i + 1}:\n{partial}" for i, partial in enumerate(partials))
+        return f"""
+A long text was split into parts and this task was performed on each part separately:
+{task}
+
+Here are the results for each part, in order:
+{parts}
+
+
+Combine them into a single answer to the task for the whole text. Keep every relevant detail and remove repetition.
+-------
+
+Answer:"""
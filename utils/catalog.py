@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from utils.run_context import OUTPUT_DIR
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = OUTPUT_DIR / "catalog.sqlite3"
+
+
+def artifact_kind(step_number, filename: str) -> str:
+    """Classify an artifact by how File.write_file was called for it."""
+    if filename.startswith("research_plan") and filename.endswith(".json"):
+        return "plan"
+    if str(step_number) == "final":
+        return "final"
+    if filename.startswith("step_report"):
+        return "step"
+    return "other"
+
+
+class RunCatalog:
+    """
+    SQLite index of research runs and their artifacts, kept up to date as File.write_file
+    persists artifacts. Listing, filtering and paging runs, and finding a run's files,
+    read the index instead of walking output/.
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        """Open the catalog on first use; a new catalog is filled from the runs already on disk."""
+        if self._conn is not None:
+            return self._conn
+        new = not self.path.exists()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS runs (
+                crewid TEXT PRIMARY KEY,
+                topic TEXT NOT NULL DEFAULT '',
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                step_count INTEGER NOT NULL DEFAULT 0,
+                steps_done INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'planned',
+                total_bytes INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS artifacts (
+                crewid TEXT NOT NULL,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                step TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (crewid, name)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated)")
+        self._conn = conn
+        if new:
+            self._import_existing_runs()
+        return conn
+
+    def record_artifact(self, crewid: str, step_number, filename: str, path: Path, content: str) -> None:
+        """
+        Register a persisted artifact and update its run's row.
+
+        Args:
+            crewid: The run the artifact belongs to
+            step_number: The step number File.write_file was given ("final" for the final report)
+            filename: The logical file name, e.g. "step_report.html"
+            path: Where the artifact was written
+            content: The artifact's content
+        """
+        kind = artifact_kind(step_number, filename)
+        raw = content.encode("utf-8", errors="surrogatepass")
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("BEGIN")
+                conn.execute(
+                    "INSERT OR IGNORE INTO runs (crewid, created, updated) VALUES (?, ?, ?)", (crewid, now, now)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO artifacts (crewid, name, kind, step, path, size, digest, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (crewid, Path(path).name, kind, str(step_number), str(path), len(raw),
+                     hashlib.sha256(raw).hexdigest(), now),
+                )
+                updates = {"updated": now}
+                if kind == "plan":
+                    try:
+                        plan = json.loads(content)
+                        updates["topic"] = plan.get("research_topic", "")
+                        updates["step_count"] = sum(1 for key in plan if key.startswith("step"))
+                    except (json.JSONDecodeError, AttributeError):
+                        pass
+                elif kind == "step":
+                    updates["status"] = "running"
+                elif kind == "final":
+                    updates["status"] = "complete"
+                assignments = ", ".join(f"{column} = ?" for column in updates)
+                conn.execute(f"UPDATE runs SET {assignments} WHERE crewid = ?", (*updates.values(), crewid))
+                conn.execute(
+                    "UPDATE runs SET total_bytes = (SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE crewid = ?), "
+                    "steps_done = (SELECT COUNT(*) FROM artifacts WHERE crewid = ? AND kind = 'step') WHERE crewid = ?",
+                    (crewid, crewid, crewid),
+                )
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # The catalog is an index; a failed update must never fail the write itself
+            logger.error(f"Run catalog update failed for {path}: {e}")
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+
+    def list_runs(self, query: str = None, status: str = None, limit: int = None, offset: int = 0):
+        """
+        List runs, most recently updated first.
+
+        Args:
+            query: Only runs whose crew ID or topic contains this text
+            status: Only runs with this status ("planned", "running" or "complete")
+            limit: Page size (all runs if None)
+            offset: Number of runs to skip
+
+        Returns:
+            (runs, total): the page of run dicts and the number of matching runs
+        """
+        where, params = [], []
+        if query:
+            where.append("(crewid LIKE ? OR topic LIKE ?)")
+            params += [f"%{query}%", f"%{query}%"]
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            conn = self._connect()
+            total = conn.execute(f"SELECT COUNT(*) FROM runs{clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM runs{clause} ORDER BY updated DESC LIMIT ? OFFSET ?",
+                (*params, -1 if limit is None else limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def get_run(self, crewid: str):
+        """Return a run dict with its artifacts (oldest first) under "artifacts", or None."""
+        with self._lock:
+            conn = self._connect()
+            run = conn.execute("SELECT * FROM runs WHERE crewid = ?", (crewid,)).fetchone()
+            if run is None:
+                return None
+            artifacts = conn.execute(
+                "SELECT * FROM artifacts WHERE crewid = ? ORDER BY created, name", (crewid,)
+            ).fetchall()
+        return {**dict(run), "artifacts": [dict(artifact) for artifact in artifacts]}
+
+    def get_artifact(self, crewid: str, name: str):
+        """Return the artifact of run crewid stored under file name name, or None."""
+        with self._lock:
+            conn = self._connect()
+            artifact = conn.execute(
+                "SELECT * FROM artifacts WHERE crewid = ? AND name = ?", (crewid, name)
+            ).fetchone()
+        return dict(artifact) if artifact else None
+
+    def _import_existing_runs(self) -> None:
+        """Index the runs that were written before the catalog existed."""
+        if not OUTPUT_DIR.exists():
+            return
+        count = 0
+        for run_dir in OUTPUT_DIR.iterdir():
+            if not run_dir.is_dir():
+                continue
+            for file in sorted(run_dir.iterdir(), key=lambda f: f.stat().st_mtime):
+                step_number, _, filename = file.name.partition("_")
+                if not file.is_file() or not filename:
+                    continue
+                try:
+                    content = file.read_text(encoding="utf-8", errors="surrogateescape")
+                except OSError:
+                    continue
+                self._import_artifact(run_dir.name, step_number, filename, file, content)
+            count += 1
+        logger.info(f"Run catalog created with {count} existing runs")
+
+    def _import_artifact(self, crewid, step_number, filename, path, content) -> None:
+        # Called with the lock held from _connect(); record_artifact would deadlock
+        kind = artifact_kind(step_number, filename)
+        if kind == "other":
+            return
+        raw = content.encode("utf-8", errors="surrogateescape")
+        created = path.stat().st_mtime
+        conn = self._conn
+        conn.execute("INSERT OR IGNORE INTO runs (crewid, created, updated) VALUES (?, ?, ?)", (crewid, created, created))
+        conn.execute(
+            "INSERT OR REPLACE INTO artifacts (crewid, name, kind, step, path, size, digest, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (crewid, path.name, kind, step_number, str(path), len(raw), hashlib.sha256(raw).hexdigest(), created),
+        )
+        if kind == "plan":
+            try:
+                plan = json.loads(content)
+                conn.execute(
+                    "UPDATE runs SET topic = ?, step_count = ? WHERE crewid = ?",
+                    (plan.get("research_topic", ""), sum(1 for key in plan if key.startswith("step")), crewid),
+                )
+            except (json.JSONDecodeError, AttributeError):
+                pass
+        status = {"step": "running", "final": "complete"}.get(kind)
+        conn.execute(
+            "UPDATE runs SET updated = MAX(updated, ?), status = CASE WHEN status = 'complete' THEN status ELSE COALESCE(?, status) END, "
+            "total_bytes = total_bytes + ?, steps_done = steps_done + ? WHERE crewid = ?",
+            (created, status, len(raw), 1 if kind == "step" else 0, crewid),
+        )
+
+
+run_catalog = RunCatalog()
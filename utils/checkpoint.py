@@ -0,0 +1,247 @@
+import json
+import logging
+import threading
+import time
+
+from utils.run_context import RunContext
+from utils.writer import artifact_writer
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class StepCheckpoint:
+    """
+    The checkpoints of one research step: its search results, the summary of every page
+    it read, and its report. Each stage is saved to the run manifest as it completes.
+    """
+
+    def __init__(self, manifest: "RunManifest", step_key: str):
+        self._manifest = manifest
+        self.step_key = step_key
+
+    @property
+    def _data(self) -> dict:
+        return self._manifest._data["steps"][self.step_key]
+
+    @property
+    def search(self):
+        """(optimized query, urls) of the step's search, or None if it has not run."""
+        with self._manifest._lock:
+            urls = self._data.get("urls")
+            return None if urls is None else (self._data.get("query"), list(urls))
+
+    def record_search(self, query: str, urls: list) -> None:
+        with self._manifest._lock:
+            self._data["query"] = query
+            self._data["urls"] = list(urls)
+        self._manifest.save()
+
+    @property
+    def summaries(self) -> dict:
+        """Page summaries made so far, by url."""
+        with self._manifest._lock:
+            return dict(self._data.get("summaries", {}))
+
+    def record_summary(self, url: str, summary: str) -> None:
+        with self._manifest._lock:
+            self._data.setdefault("summaries", {})[url] = summary
+        self._manifest.save()
+
+    @property
+    def report(self):
+        """{'summary', 'execution_time'} of the finished step, or None."""
+        with self._manifest._lock:
+            report = self._data.get("report")
+            return None if report is None else {"summary": report, "execution_time": self._data.get("execution_time")}
+
+    def record_report(self, report: str, execution_time: str) -> None:
+        with self._manifest._lock:
+            self._data["report"] = report
+            self._data["execution_time"] = execution_time
+        self._manifest.save()
+
+
+class RunInProgressError(Exception):
+    """Raised when a run is started while a request is still working on it."""
+
+
+class RunManifest:
+    """
+    Checkpoints of a research run, kept in output/<crewid>/manifest.json: the run's inputs,
+    a StepCheckpoint per step and the final report. Saves are coalesced and written
+    atomically on the artifact writer, so a run that dies can be resumed from its last
+    completed stage.
+
+    Only runs that a request is working on are kept in memory; finish() writes the
+    manifest out and drops it, and load() reads other runs from disk.
+    """
+
+    _manifests = {}  # crewid -> RunManifest of live runs
+    _manifests_lock = threading.Lock()
+
+    def __init__(self, crewid: str, data: dict):
+        self.crewid = crewid
+        self.path = RunContext.for_crewid(crewid).output_dir / MANIFEST_NAME
+        self._data = data
+        self._lock = threading.RLock()
+        self._save_queued = False
+        self._finished = False
+
+    @staticmethod
+    def load(crewid: str):
+        """
+        Return the manifest of run crewid: the live one if a request is working on the
+        run, otherwise a copy read from disk.
+
+        Returns:
+            The RunManifest, or None if the run has no manifest
+        """
+        with RunManifest._manifests_lock:
+            manifest = RunManifest._manifests.get(crewid)
+        return manifest if manifest is not None else RunManifest._read(crewid)
+
+    @staticmethod
+    def _read(crewid: str):
+        path = RunContext.for_crewid(crewid).output_dir / MANIFEST_NAME
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return RunManifest(crewid, json.load(file))
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            logger.error(f"Unreadable run manifest {path}: {e}")
+            return None
+
+    @staticmethod
+    def is_live(crewid: str) -> bool:
+        """True while a request is working on run crewid."""
+        with RunManifest._manifests_lock:
+            return crewid in RunManifest._manifests
+
+    @staticmethod
+    def start(crewid: str, research_steps: dict, entities: dict, search_terms: dict, resume: bool = False) -> "RunManifest":
+        """
+        Begin (or, with resume, continue) a run with the given inputs. Checkpoints of a step
+        whose text or search term changed are dropped; without resume all of them are.
+        The run stays live until finish() is called.
+
+        Returns:
+            The run's RunManifest
+
+        Raises:
+            RunInProgressError: If a request is still working on the run
+        """
+        with RunManifest._manifests_lock:
+            if crewid in RunManifest._manifests:
+                raise RunInProgressError(f"Research {crewid} is still running")
+            manifest = RunManifest._read(crewid) if resume else None
+            if manifest is None:
+                manifest = RunManifest(crewid, {"created": time.time(), "steps": {}})
+            RunManifest._manifests[crewid] = manifest
+        with manifest._lock:
+            data = manifest._data
+            data.update({
+                "crewid": crewid,
+                "status": "running",
+                "research_steps": research_steps,
+                "entities": entities,
+                "search_terms": search_terms,
+            })
+            steps = data.setdefault("steps", {})
+            for step_key, step in research_steps.items():
+                search_term = search_terms.get(step_key)
+                existing = steps.get(step_key)
+                if not resume or existing is None or existing.get("step") != step or existing.get("search_term") != search_term:
+                    steps[step_key] = {"step": step, "search_term": search_term}
+            for step_key in list(steps):
+                if step_key not in research_steps:
+                    del steps[step_key]
+        manifest.save()
+        return manifest
+
+    def finish(self, status: str, steps: list = ()) -> None:
+        """
+        End the request working on the run. Once the futures in steps (research steps
+        still running for it) are done, status ("complete", "failed" or "interrupted") is
+        recorded unless the run already completed, the manifest is written out and the
+        run is no longer live. Only the first call has any effect.
+        """
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        pending = [future for future in steps if not future.done()]
+        if not pending:
+            self._release(status)
+            return
+        remaining = [len(pending)]
+        remaining_lock = threading.Lock()
+
+        def _step_done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._release(status)
+
+        for future in pending:
+            future.add_done_callback(_step_done)
+
+    def _release(self, status: str) -> None:
+        with self._lock:
+            if self._data.get("status") != "complete":
+                self._data["status"] = status
+        # Landed before the run is dropped, so a later load() reads its final state
+        self.save()
+        artifact_writer.flush(self.crewid)
+        with RunManifest._manifests_lock:
+            if RunManifest._manifests.get(self.crewid) is self:
+                del RunManifest._manifests[self.crewid]
+
+    @property
+    def research_steps(self) -> dict:
+        return dict(self._data.get("research_steps", {}))
+
+    @property
+    def entities(self) -> dict:
+        return dict(self._data.get("entities", {}))
+
+    @property
+    def search_terms(self) -> dict:
+        return dict(self._data.get("search_terms", {}))
+
+    def step(self, step_key: str) -> StepCheckpoint:
+        return StepCheckpoint(self, step_key)
+
+    def final_report(self, inputs_digest: str):
+        """The saved final report if it was generated from the same step results, else None."""
+        with self._lock:
+            if self._data.get("final_inputs_digest") != inputs_digest:
+                return None
+            return self._data.get("final_report")
+
+    def record_final_report(self, report: str, inputs_digest: str) -> None:
+        with self._lock:
+            self._data["final_report"] = report
+            self._data["final_inputs_digest"] = inputs_digest
+            self._data["status"] = "complete"
+        self.save()
+
+    def save(self) -> None:
+        """Queue a save. Saves that pile up while one is queued are written together."""
+        with self._lock:
+            self._data["updated"] = time.time()
+            if self._save_queued:
+                return
+            self._save_queued = True
+        artifact_writer.submit(self.crewid, self._write, str(self.path))
+
+    def _write(self) -> None:
+        with self._lock:
+            self._save_queued = False
+            content = json.dumps(self._data)
+        # Temp file and rename: a crash leaves the previous manifest, never half of one
+        artifact_writer.write_now(self.path, content)
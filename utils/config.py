@@ -48,11 +48,114 @@ class Config:
         APP_HOME = Path(os.getenv("APP_HOME", Path(__file__).parent.parent))
         DATA_DIR = APP_HOME / "data"
         OUTPUT_DIR = APP_HOME / "output"
+        CACHE_DIR = Path(os.getenv("CACHE_DIR", APP_HOME / "cache"))
         TOOLS_FOLDER = APP_HOME / "lib/capabilities"
     
-    USE_THREADS=False #determines if dimensions analysis will run in parallel or not.
+    USE_THREADS = os.getenv("USE_THREADS", "true").lower() == "true" #determines if research steps run in parallel (on the shared step pool) or one after another.
+
+    # Per-run counters (utils/run_stats.py, /run_stats) are kept for this many recent runs
+    RUN_STATS_MAX_RUNS = int(os.getenv("RUN_STATS_MAX_RUNS", 256))
+
+    # Process-wide scheduler limits, shared by every request (see utils/scheduler.py)
+    MAX_STEP_WORKERS = int(os.getenv("MAX_STEP_WORKERS", 8))
+    MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", 8))
+    MAX_CONCURRENT_SEARCHES = int(os.getenv("MAX_CONCURRENT_SEARCHES", 4))
+
+    # Concurrent scrape-and-summarize width inside a single research step, and the
+    # process-wide ceiling on page fetches shared by every step running at the same time.
+    FETCH_WORKERS_PER_STEP = int(os.getenv("FETCH_WORKERS_PER_STEP", 5))
+    FETCH_WORKERS_PER_PROCESS = int(os.getenv("FETCH_WORKERS_PER_PROCESS", 16))
+    # Pages whose SimHash fingerprints differ in at most this many of 64 bits count as
+    # near-duplicates; only the best ranked copy is summarized
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", 3))
+    # Adaptive fetching: failed pages are skipped and replaced, extra pages are fetched ahead
+    # according to the observed failure rate, and a step stops fetching once it has
+    # FETCH_MIN_PAGES pages with FETCH_CONTENT_BUDGET_CHARS of text, or at the deadline
+    ADAPTIVE_FETCH = os.getenv("ADAPTIVE_FETCH", "true").lower() == "true"
+    FETCH_MIN_PAGES = int(os.getenv("FETCH_MIN_PAGES", 3))
+    FETCH_CONTENT_BUDGET_CHARS = int(os.getenv("FETCH_CONTENT_BUDGET_CHARS", 150000))
+    FETCH_DEADLINE_SECONDS = float(os.getenv("FETCH_DEADLINE_SECONDS", 60))
 
     REPORTS_FORMAT="txt" #"md" "html" "json" "txt"
 
+    # "graph": entities, plan and search terms as a dependency graph (independent LLM calls run concurrently)
+    # "fused": a single structured LLM call returns all three, falling back to "graph" if it is unusable
+    PLANNING_MODE = os.getenv("PLANNING_MODE", "graph")
+
+    # Stream report tokens to the client as NDJSON events while the model writes them
+    STREAM_FINAL_REPORT = os.getenv("STREAM_FINAL_REPORT", "true").lower() == "true"
+    STREAM_STEP_REPORTS = os.getenv("STREAM_STEP_REPORTS", "false").lower() == "true"
+
+    # Estimated prompt tokens the final report may take in one call. Larger inputs are
+    # condensed per step in parallel (map) and merged in tiers (reduce) until they fit.
+    FINAL_REPORT_TOKEN_BUDGET = int(os.getenv("FINAL_REPORT_TOKEN_BUDGET", 24000))
+
+    # Text tasks (page summaries) on inputs over TEXT_TASK_CHUNK_TOKENS are split into chunks
+    # processed in parallel and merged; inputs over TEXT_TASK_MAX_TOKENS are cut to that size first
+    TEXT_TASK_CHUNK_TOKENS = int(os.getenv("TEXT_TASK_CHUNK_TOKENS", 6000))
+    TEXT_TASK_MAX_TOKENS = int(os.getenv("TEXT_TASK_MAX_TOKENS", 48000))
+
+    # Serper API base URL; point it at a local stand-in server for offline runs
+    SERPER_BASE_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/")
+
+    # Connection pool of the shared async HTTP client (utils/aio.py)
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 50))
+
+    # Logging pipeline (utils/logger_config.py): level, per-run log files under
+    # output/<crewid>/run.log, and the longest message logged before it is cut
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    RUN_LOG_FILES = os.getenv("RUN_LOG_FILES", "true").lower() == "true"
+    LOG_MAX_PAYLOAD_CHARS = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", 2000))
+
+    # HTTP delivery (utils/delivery.py): responses of at least COMPRESS_MIN_BYTES are
+    # gzip-compressed, or brotli-compressed when the brotli package is installed, and run
+    # artifacts, which are never rewritten, may be cached by browsers for ARTIFACT_MAX_AGE seconds
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+    ARTIFACT_MAX_AGE = int(os.getenv("ARTIFACT_MAX_AGE", 31536000))
+
+    # Background PDF rendering (utils/pdf_renderer.py). A finished job is held until it is
+    # polled, or for PDF_JOB_TTL seconds if nobody polls it
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", 2))
+    PDF_JOB_TTL = int(os.getenv("PDF_JOB_TTL", 600))
+
+    # Process metrics served at /metrics (utils/metrics.py), as <METRICS_NAMESPACE>_<name>
+    METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "deepsprint")
+
+    class Cache:
+        # Optimized search queries: in-process LRU size, and whether to also keep them on disk
+        QUERY_MEMORY_ENTRIES = 2048
+        PERSIST_QUERIES = os.getenv("PERSIST_QUERY_CACHE", "true").lower() == "true"
+
+        # Scraped page text, keyed by normalized URL
+        PAGE_TTL = int(os.getenv("PAGE_CACHE_TTL", 24 * 60 * 60))  # seconds
+        PAGE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))  # compressed size
+        # SimHash fingerprints of page text, keyed by content digest (16 hex characters each)
+        FINGERPRINT_TTL = int(os.getenv("FINGERPRINT_CACHE_TTL", 7 * 24 * 60 * 60))  # seconds
+        FINGERPRINT_MAX_BYTES = int(os.getenv("FINGERPRINT_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+        # TextUtils.perform_task results, keyed by (input text hash, task, model)
+        SUMMARY_MEMORY_BYTES = int(os.getenv("SUMMARY_CACHE_MEMORY_BYTES", 64 * 1024 * 1024))
+        SUMMARY_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+        # Serper responses, keyed by (endpoint, normalized query, num, tbs). Freshness per endpoint (seconds).
+        SEARCH_TTL = {
+            "search": int(os.getenv("SEARCH_CACHE_TTL", 6 * 60 * 60)),
+            "news": int(os.getenv("NEWS_CACHE_TTL", 15 * 60)),
+        }
+        SEARCH_MEMORY_BYTES = int(os.getenv("SEARCH_CACHE_MEMORY_BYTES", 16 * 1024 * 1024))
+        SEARCH_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+        # Step and final reports, keyed by everything they are made from (step text, search
+        # term, entities, model; the step results for final reports), so re-executing an
+        # edited plan only reruns the steps that changed. Reports are reused within one
+        # date bucket only, since they are written for "today".
+        REPORT_DATE_BUCKET_HOURS = int(os.getenv("REPORT_DATE_BUCKET_HOURS", 24))
+        REPORT_MEMORY_BYTES = int(os.getenv("REPORT_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+        REPORT_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+        # Rendered PDFs, keyed by (content, title, template) hash
+        PDF_MEMORY_BYTES = int(os.getenv("PDF_CACHE_MEMORY_BYTES", 128 * 1024 * 1024))
+
 
     # MODEL = Model.LLAMA_3
\ No newline at end of file
@@ -1,8 +1,14 @@
 import random
+import threading
+import uuid
+
+from utils.run_context import current_run
 
 class CrewID:
     _instance = None
+    # Process-wide default crew ID, used outside of a run context (CLI, UI bootstrap)
     crewid = None
+    _lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         return cls._instance
@@ -14,12 +20,24 @@ class CrewID:
 
     @staticmethod
     def get_crewid() -> str:
-        if CrewID.crewid is None:
-            CrewID.generate_crewid()
-        return CrewID.crewid
+        # The active run, if any, wins over the process-wide default
+        run = current_run()
+        if run is not None:
+            return run.crewid
+        with CrewID._lock:
+            if CrewID.crewid is not None:
+                return CrewID.crewid
+        return CrewID.generate_crewid()
 
     @staticmethod
     def generate_crewid() -> str:
-        CrewID.crewid = str(random.randint(1000, 9999))
-        print(f"\n\n\n**************************************\ncrewid.py: Generated Crew ID: {CrewID.crewid}\n*******************************\n\n")
-        return CrewID.crewid
+        crewid = str(random.randint(1000, 9999))
+        with CrewID._lock:
+            CrewID.crewid = crewid
+        print(f"\n\n\n**************************************\ncrewid.py: Generated Crew ID: {crewid}\n*******************************\n\n")
+        return crewid
+
+    @staticmethod
+    def new_crewid() -> str:
+        """A crew ID for one request's run. Unlike generate_crewid it leaves the process-wide default alone."""
+        return uuid.uuid4().hex[:12]
@@ -0,0 +1,92 @@
+import gzip
+import logging
+
+from flask import Response, request
+
+from utils.cache import LRUCache
+from utils.config import Config
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+_COMPRESSIBLE_TYPES = {"application/json", "application/javascript", "image/svg+xml"}
+
+# Compressed bodies of responses with an ETag, so revisiting a run does not compress its reports again
+_compressed = LRUCache(max_entries=256, max_bytes=32 * 1024 * 1024)
+
+
+def not_modified(etag: str, cache_control: str):
+    """
+    Answer a conditional GET without building the response.
+
+    Args:
+        etag: The current entity tag of the requested resource
+        cache_control: Cache-Control header of the resource
+
+    Returns:
+        A 304 response if the client's copy (If-None-Match) is current, otherwise None
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    set_validators(response, etag, cache_control)
+    return response
+
+
+def set_validators(response: Response, etag: str, cache_control: str) -> Response:
+    """Set the ETag and Cache-Control headers of a response."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response body with the best encoding the client accepts.
+
+    Streamed, file and small responses, and those that are not text, are left alone.
+    Strong ETags become weak, since the bytes on the wire now depend on the encoding.
+
+    Args:
+        response: The response to compress
+
+    Returns:
+        The response
+    """
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not (response.mimetype.startswith("text/") or response.mimetype in _COMPRESSIBLE_TYPES)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None or (response.content_length or 0) < Config.COMPRESS_MIN_BYTES:
+        return response
+
+    etag, weak = response.get_etag()
+    key = (etag, encoding) if etag else None
+    body = _compressed.get(key) if key else None
+    if body is None:
+        data = response.get_data()
+        if encoding == "br":
+            body = brotli.compress(data, quality=Config.COMPRESS_LEVEL)
+        else:
+            body = gzip.compress(data, compresslevel=Config.COMPRESS_LEVEL)
+        if key:
+            _compressed.set(key, body)
+        logger.debug("Compressed %s response from %s to %s bytes", encoding, len(data), len(body))
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
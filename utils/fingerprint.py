@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import re
+
+from utils.cache import DiskCache, content_digest
+from utils.config import Config
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_SHINGLE_SIZE = 3
+_BITS = 64
+
+# SimHash fingerprints by content digest; a page seen in an earlier run is not hashed again
+_fingerprints = DiskCache("fingerprints", ttl=Config.Cache.FINGERPRINT_TTL,
+                          max_bytes=Config.Cache.FINGERPRINT_MAX_BYTES)
+
+
+def simhash(text: str) -> int:
+    """
+    Compute the 64-bit SimHash of a text over its lower-cased word 3-shingles.
+    Texts that share most of their shingles get fingerprints a few bits apart.
+
+    Args:
+        text: The text to fingerprint
+
+    Returns:
+        The fingerprint as an unsigned 64-bit integer
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < _SHINGLE_SIZE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)]
+
+    weights = [0] * _BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(_BITS) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count("1")
+
+
+def page_fingerprint(text: str) -> int:
+    """
+    Return the SimHash of a page text, from the persistent fingerprint store when it was
+    computed before. Blocking (SQLite); call it from a worker thread on the event loop.
+    """
+    key = content_digest(text)
+    stored = _fingerprints.get(key)
+    if stored is not None:
+        return int(stored, 16)
+    fingerprint = simhash(text)
+    _fingerprints.set(key, format(fingerprint, "016x"))
+    return fingerprint
+
+
+class NearDuplicateIndex:
+    """The fingerprints of the pages kept so far, for near-duplicate checks within one step."""
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self._kept = []  # (fingerprint, url)
+
+    def find(self, fingerprint: int):
+        """Return the url of a kept page within max_distance bits of fingerprint, or None."""
+        for kept, url in self._kept:
+            if hamming_distance(kept, fingerprint) <= self.max_distance:
+                return url
+        return None
+
+    def add(self, fingerprint: int, url: str) -> None:
+        self._kept.append((fingerprint, url))
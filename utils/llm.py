@@ -0,0 +1,86 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from utils.config import default_model
+from utils.crewid import CrewID
+from utils.capabilities.File import File
+from utils.scheduler import scheduler
+from utils.metrics import failures, llm_call_seconds, llm_first_token_seconds, prompt_type
+from utils.run_stats import RunStats
+from utils.tokens import estimate_tokens
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+
+async def ainvoke(prompt: str, prompt_name: str) -> str:
+    """
+    Run a prompt through the default model within the process-wide LLM limit.
+
+    Args:
+        prompt: The prompt to send
+        prompt_name: Name the prompt is archived under (also identifies the call type)
+
+    Returns:
+        The stripped text content of the model's response
+    """
+    File.save_prompt(CrewID.get_crewid(), prompt_name, prompt)
+    async with scheduler.aslot("llm"):
+        with _measure(prompt_name):
+            response = await default_model.ainvoke(prompt)
+    _record_usage(prompt_name, prompt, response.content, getattr(response, "usage_metadata", None))
+    File.save_response(CrewID.get_crewid(), prompt_name, response.content)
+    return response.content.strip()
+
+
+async def astream(prompt: str, prompt_name: str):
+    """
+    Stream a prompt's response from the default model, chunk by chunk, within the LLM limit.
+
+    Yields:
+        Text chunks of the response as the model produces them
+    """
+    File.save_prompt(CrewID.get_crewid(), prompt_name, prompt)
+    chunks = []
+    usage = None
+    async with scheduler.aslot("llm"):
+        with _measure(prompt_name):
+            started = time.perf_counter()
+            async for chunk in default_model.astream(prompt):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.content:
+                    if not chunks:
+                        llm_first_token_seconds.observe(time.perf_counter() - started, prompt=prompt_type(prompt_name))
+                    chunks.append(chunk.content)
+                    yield chunk.content
+    _record_usage(prompt_name, prompt, "".join(chunks), usage)
+    File.save_response(CrewID.get_crewid(), prompt_name, "".join(chunks))
+
+
+@contextmanager
+def _measure(prompt_name: str):
+    """Observe a model call's latency under its prompt type, and count it if it fails."""
+    kind = prompt_type(prompt_name)
+    try:
+        with llm_call_seconds.time(prompt=kind):
+            yield
+    except Exception:
+        failures.inc(stage="llm")
+        raise
+
+
+def _record_usage(prompt_name: str, prompt: str, completion: str, usage: dict = None) -> None:
+    """
+    Count the tokens of one model call in the run's stats. Uses the provider's usage
+    numbers when it reports them and the local estimate otherwise.
+    """
+    if usage:
+        prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(completion)
+    crewid = CrewID.get_crewid()
+    RunStats.incr(crewid, "llm_calls")
+    RunStats.incr(crewid, "llm_prompt_tokens", prompt_tokens)
+    RunStats.incr(crewid, "llm_completion_tokens", completion_tokens)
+    logger.debug("LLM call '%s': %s prompt tokens, %s completion tokens", prompt_name, prompt_tokens, completion_tokens)
@@ -1,33 +1,115 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import threading
-from utils.crewid import CrewID
+from collections import OrderedDict
+
+from utils.config import Config
+from utils.run_context import OUTPUT_DIR, current_run
+
+_FORMAT = '%(filename)s:%(lineno)d - CrewID:%(crewid)s - %(message)s'
+_MAX_OPEN_RUN_LOGS = 32
+
+
+class CrewIDFilter(logging.Filter):
+    """Tags each record with the crew ID of the run that logged it (record.crewid)."""
+
+    def filter(self, record):
+        # Runs on the thread that logged, where the run context is visible. Records logged
+        # outside a run get no crew ID, so they never reach a run's log file.
+        run = current_run()
+        record.crewid = run.crewid if run is not None else None
+        return True
+
+
+class CappedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread. The message is rendered once here, so it is
+    only formatted for records that pass the level check, and cut to max_chars.
+    """
+
+    def __init__(self, log_queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        if self.max_chars and len(record.msg) > self.max_chars:
+            record.msg = f"{record.msg[:self.max_chars]}... [{len(record.msg) - self.max_chars} more characters]"
+        return record
+
+
+class RunFileHandler(logging.Handler):
+    """Appends each run's records to output/<crewid>/run.log, keeping recent files open."""
+
+    def __init__(self):
+        super().__init__()
+        self._files = OrderedDict()  # crewid -> open file, least recently used first
+
+    def emit(self, record):
+        crewid = getattr(record, "crewid", None)
+        if not crewid:
+            return
+        try:
+            file = self._files.get(crewid)
+            if file is None:
+                path = OUTPUT_DIR / crewid
+                path.mkdir(parents=True, exist_ok=True)
+                file = open(path / "run.log", "a", encoding="utf-8")
+                self._files[crewid] = file
+                if len(self._files) > _MAX_OPEN_RUN_LOGS:
+                    self._files.popitem(last=False)[1].close()
+            else:
+                self._files.move_to_end(crewid)
+            file.write(self.format(record) + "\n")
+            file.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        super().close()
 
-# Define a custom formatter
-class CrewIDFormatter(logging.Formatter):
-    def format(self, record):
-        record.msg = f"CrewID:{CrewID.get_crewid()} - {record.msg}"
-        return super().format(record)
 
 # Create a lock to synchronize access to the logger
 logging_lock = threading.Lock()
+_listener = None
+
 
 def setup_logger():
+    """
+    Route all logging through a queue: callers only enqueue records, and a listener
+    thread writes them to the console and to the per-run log files. Safe to call repeatedly.
+    """
+    global _listener
     with logging_lock:
-        # Get the root logger
-        logger = logging.getLogger()
-
-        # Create a handler (e.g., StreamHandler for console output)
-        handler = logging.StreamHandler()
+        if _listener is not None:
+            return
 
-        # Create an instance of your custom formatter
-        formatter = CrewIDFormatter('%(filename)s:%(lineno)d - %(message)s')
+        formatter = logging.Formatter(_FORMAT)
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        handlers = [console]
+        if Config.RUN_LOG_FILES:
+            run_files = RunFileHandler()
+            run_files.setFormatter(formatter)
+            handlers.append(run_files)
 
-        # Set the formatter for the handler
-        handler.setFormatter(formatter)
+        log_queue = queue.SimpleQueue()
+        queue_handler = CappedQueueHandler(log_queue, Config.LOG_MAX_PAYLOAD_CHARS)
+        queue_handler.addFilter(CrewIDFilter())
 
-        # Add the handler to the logger ONLY IF NO HANDLERS ARE DEFINED
-        if not logger.handlers:  
-            logger.addHandler(handler)
+        # Get the root logger
+        logger = logging.getLogger()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+        logger.setLevel(Config.LOG_LEVEL)
 
-        # Set the logging level
-        logger.setLevel(logging.DEBUG)
\ No newline at end of file
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Drain the queue at exit so the last records are not lost
+        atexit.register(_listener.stop)
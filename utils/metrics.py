@@ -0,0 +1,237 @@
+import bisect
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.config import Config
+
+# Seconds; covers fast cache-backed calls up to slow model calls
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+_NAME = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A named metric with optional labels; one value (or histogram) per label combination."""
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid metric name: {name}")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.type != "histogram":
+            # An unlabeled counter or gauge is reported as 0 until it first changes
+            self._values[()] = 0
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        """(suffix, label values, extra label, value) for every sample of the metric."""
+        with self._lock:
+            return [("", key, "", value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, key, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. cache hits or failures."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, e.g. work in flight. A gauge given a collect function
+    reads its values from it at scrape time instead: collect returns {label values: value}.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        """Count the enclosed block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        if self._collect is None:
+            return super()._samples()
+        values = {(key if isinstance(key, tuple) else (key,)): value for key, value in self._collect().items()}
+        return [("", tuple(str(part) for part in key), "", value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their count and sum."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how many seconds the enclosed block takes, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(("_bucket", key, f'le="{_format_value(float(bound))}"', cumulative))
+            samples.append(("_sum", key, "", total))
+            samples.append(("_count", key, "", cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """The process-wide set of metrics, rendered for /metrics in the Prometheus text format."""
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        name = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = (), collect=None) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames, collect=collect)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics = MetricsRegistry(Config.METRICS_NAMESPACE)
+
+llm_call_seconds = metrics.histogram(
+    "llm_call_seconds", "Duration of model calls, by prompt type.", ("prompt",))
+llm_first_token_seconds = metrics.histogram(
+    "llm_first_token_seconds", "Time to the first chunk of streamed model calls, by prompt type.", ("prompt",))
+search_seconds = metrics.histogram(
+    "search_seconds", "Duration of Serper requests that missed the cache, by endpoint.", ("endpoint",))
+fetch_seconds = metrics.histogram(
+    "fetch_seconds", "Duration of page fetches that missed the cache, by outcome (ok, empty or error).", ("status",))
+summarization_tokens = metrics.histogram(
+    "summarization_tokens", "Estimated tokens of page summarization tasks, by direction (input or output).",
+    ("direction",), buckets=TOKEN_BUCKETS)
+stage_seconds = metrics.histogram(
+    "stage_seconds", "Duration of research stages (plan, step, final_report).", ("stage",))
+cache_requests = metrics.counter(
+    "cache_requests_total", "Cache lookups, by cache and result (hit or miss).", ("cache", "result"))
+failures = metrics.counter(
+    "failures_total", "Failed operations, by stage.", ("stage",))
+steps_in_flight = metrics.gauge(
+    "steps_in_flight", "Research steps currently running.")
+
+
+def prompt_type(prompt_name: str) -> str:
+    """The type of a prompt archived as prompt_name, e.g. "step_3_summary" -> "step_summary"."""
+    return re.sub(r"_\d+(?=_|$)", "", prompt_name)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Observe how long a research stage takes, and count it as a failure if it raises."""
+    try:
+        with stage_seconds.time(stage=stage):
+            yield
+    except Exception:
+        failures.inc(stage=stage)
+        raise
@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+from xhtml2pdf import pisa
+
+from utils.cache import LRUCache, cache_key, content_digest
+from utils.config import Config
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+PDF_TEMPLATE = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>{title}</title>
+            <meta charset="UTF-8">
+            <style>
+                @page {{
+                    size: a4;
+                    margin: 1cm;
+                }}
+                body {{ 
+                    font-family: Arial, sans-serif; 
+                    margin: 40px; 
+                    line-height: 1.6; 
+                    color: #333;
+                }}
+                h1 {{ 
+                    color: #2c3e50; 
+                    border-bottom: 1px solid #eee; 
+                    padding-bottom: 10px;
+                    font-size: 24px;
+                }}
+                h2 {{ 
+                    color: #3498db; 
+                    margin-top: 20px;
+                    font-size: 20px;
+                }}
+                h3 {{ 
+                    color: #2980b9;
+                    font-size: 18px;
+                }}
+                table {{
+                    border-collapse: collapse;
+                    width: 100%;
+                    margin: 20px 0;
+                }}
+                th, td {{
+                    border: 1px solid #ddd;
+                    padding: 8px;
+                    text-align: left;
+                }}
+                th {{
+                    background-color: #f2f2f2;
+                }}
+                .citation {{
+                    font-size: 12px;
+                    color: #7f8c8d;
+                    margin-top: 5px;
+                }}
+                .footer {{
+                    text-align: center;
+                    font-size: 12px;
+                    margin-top: 30px;
+                    color: #7f8c8d;
+                }}
+                ul, ol {{
+                    margin-left: 20px;
+                }}
+                img {{
+                    max-width: 100%;
+                    height: auto;
+                }}
+            </style>
+        </head>
+        <body>
+            {content}
+            <div class="footer">
+                Generated on {generated}
+            </div>
+        </body>
+        </html>
+        """
+# Part of every cache key, so changing the template invalidates rendered PDFs
+TEMPLATE_DIGEST = content_digest(PDF_TEMPLATE)
+
+
+class PdfRenderError(Exception):
+    """Raised when xhtml2pdf cannot render a document."""
+
+
+class PdfRenderer:
+    """
+    Renders PDFs on a small worker pool, off the request threads. A job is identified by
+    the hash of (content, title, template): identical requests share one job, and finished
+    PDFs are kept in memory, so downloading the same report again costs nothing.
+    """
+
+    def __init__(self, workers: int, cache_bytes: int, job_ttl: float):
+        self._workers = workers
+        self._pool = None
+        self._jobs = {}  # job id -> Future of the PDF bytes, until result() hands it out
+        self._finished = {}  # job id -> monotonic time its render finished
+        self._job_ttl = job_ttl
+        self._lock = threading.Lock()
+        self._pdfs = LRUCache(max_entries=1024, max_bytes=cache_bytes)
+
+    @staticmethod
+    def job_id(content: str, title: str) -> str:
+        """The cache key (and job id) of a document."""
+        return cache_key(content, title, TEMPLATE_DIGEST)
+
+    @staticmethod
+    def render_html(content: str, title: str) -> str:
+        """Wrap report HTML in the PDF template."""
+        return PDF_TEMPLATE.format(
+            title=title, content=content, generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+
+    def submit(self, content: str, title: str, html: str = None) -> str:
+        """
+        Start rendering a document unless it is cached or already being rendered.
+
+        Args:
+            content: The report HTML
+            title: The document title
+            html: The document already wrapped by render_html(), if the caller has it
+
+        Returns:
+            The job id, to be passed to result()
+        """
+        job_id = PdfRenderer.job_id(content, title)
+        with self._lock:
+            self._prune()
+            if job_id in self._pdfs:
+                return job_id
+            future = self._jobs.get(job_id)
+            # A finished job is reused until it is handed out; one that failed is retried
+            if future is not None and (not future.done() or future.exception() is None):
+                return job_id
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="pdf")
+            html = html if html is not None else PdfRenderer.render_html(content, title)
+            future = self._pool.submit(self._render, job_id, html)
+            self._jobs[job_id] = future
+            # A retried job is not finished; the failed attempt's time must not expire it
+            self._finished.pop(job_id, None)
+        return job_id
+
+    def result(self, job_id: str):
+        """
+        Look up a job. A finished job is held (whatever the PDF cache evicts) until it has
+        been handed out once.
+
+        Returns:
+            ("done", pdf_bytes), ("pending", None), ("error", message) or ("unknown", None)
+        """
+        with self._lock:
+            future = self._jobs.get(job_id)
+            if future is not None and future.done():
+                del self._jobs[job_id]
+                self._finished.pop(job_id, None)
+        if future is None:
+            pdf = self._pdfs.get(job_id)
+            return ("done", pdf) if pdf is not None else ("unknown", None)
+        if not future.done():
+            return "pending", None
+        try:
+            return "done", future.result()
+        except Exception as e:
+            return "error", str(e)
+
+    def _prune(self) -> None:
+        """Drop finished jobs nobody polled within the job TTL. Called with the lock held."""
+        cutoff = time.monotonic() - self._job_ttl
+        for job_id in [job_id for job_id, finished in self._finished.items() if finished < cutoff]:
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    def _render(self, job_id: str, html: str) -> bytes:
+        """Render in memory; the PDF never touches the disk."""
+        try:
+            output = BytesIO()
+            status = pisa.CreatePDF(html, dest=output)
+            if status.err:
+                raise PdfRenderError(f"PDF generation failed with {status.err} errors")
+            pdf = output.getvalue()
+            self._pdfs.set(job_id, pdf)
+        finally:
+            # Failed jobs expire as well if nobody polls them
+            with self._lock:
+                self._finished[job_id] = time.monotonic()
+        logger.info(f"Rendered PDF {job_id[:12]} ({len(pdf)} bytes)")
+        return pdf
+
+
+pdf_renderer = PdfRenderer(Config.PDF_WORKERS, Config.Cache.PDF_MEMORY_BYTES, Config.PDF_JOB_TTL)
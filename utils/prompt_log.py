@@ -0,0 +1,124 @@
+import gzip
+import json
+import logging
+import time
+from pathlib import Path
+
+from utils.cache import LRUCache
+from utils.run_context import RunContext, current_run
+from utils.writer import artifact_writer
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+LOG_NAME = "prompts.jsonl.gz"
+INDEX_NAME = "prompts.idx"
+
+
+class PromptLog:
+    """
+    Append-only prompt/response log, one per run, in the run's prompts directory.
+
+    Every record is one JSON object ({"seq", "ts", "name", "kind", "text"}) compressed as
+    its own gzip member and appended to prompts.jsonl.gz, so the whole file still reads as
+    gzipped JSONL. prompts.idx holds one JSON line per record with its byte offset and
+    length, for random access. Appends go through the artifact writer, which runs them
+    one at a time, so archiving a prompt costs one sequential write and no new file.
+    """
+
+    # Log path -> next sequence number, for the most recently written logs only. A log
+    # that is not in here continues from the length of its index. Only touched on the writer thread.
+    _next_seq = LRUCache(max_entries=64)
+
+    @staticmethod
+    def _paths(crewid: str):
+        run = current_run()
+        if run is None or run.crewid != crewid:
+            run = RunContext.for_crewid(crewid)
+        return run.prompts_dir / LOG_NAME, run.prompts_dir / INDEX_NAME
+
+    @staticmethod
+    def append(crewid: str, name: str, kind: str, text: str) -> None:
+        """
+        Queue a record for the run's log.
+
+        Args:
+            crewid: The run the record belongs to
+            name: Prompt name, e.g. "final_report" or "step_2_summary"
+            kind: "prompt" or "response"
+            text: The prompt or response text
+        """
+        log_path, index_path = PromptLog._paths(crewid)
+        record = {"ts": time.time(), "name": name, "kind": kind, "text": text}
+        artifact_writer.submit(crewid, lambda: PromptLog._write(log_path, index_path, record), str(log_path))
+
+    @staticmethod
+    def _write(log_path: Path, index_path: Path, record: dict) -> None:
+        artifact_writer.ensure_dir(log_path.parent)
+        seq = PromptLog._next_seq.get(log_path)
+        if seq is None:
+            # Continue the numbering of a log from an earlier process, or one evicted from _next_seq
+            seq = len(PromptLog._read_index(index_path))
+        record = {"seq": seq, **record}
+        member = gzip.compress(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n", compresslevel=6)
+        with open(log_path, "ab") as log:
+            offset = log.tell()
+            log.write(member)
+        entry = {"seq": seq, "ts": record["ts"], "name": record["name"], "kind": record["kind"],
+                 "offset": offset, "length": len(member), "chars": len(record["text"])}
+        with open(index_path, "a", encoding="utf-8") as index:
+            index.write(json.dumps(entry) + "\n")
+        PromptLog._next_seq.set(log_path, seq + 1)
+
+    @staticmethod
+    def _read_index(index_path: Path) -> list:
+        try:
+            with open(index_path, "r", encoding="utf-8") as index:
+                return [json.loads(line) for line in index if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def entries(crewid: str) -> list:
+        """
+        List a run's records without their text.
+
+        Returns:
+            Index entries ({"seq", "ts", "name", "kind", "offset", "length", "chars"}) in log order
+        """
+        artifact_writer.flush(crewid)
+        return PromptLog._read_index(PromptLog._paths(crewid)[1])
+
+    @staticmethod
+    def read(crewid: str, seq: int):
+        """
+        Read one record of a run's log by sequence number, seeking straight to it.
+
+        Returns:
+            The record, or None if there is no record seq
+        """
+        entries = PromptLog.entries(crewid)
+        if not 0 <= seq < len(entries):
+            return None
+        entry = entries[seq]
+        with open(PromptLog._paths(crewid)[0], "rb") as log:
+            log.seek(entry["offset"])
+            return json.loads(gzip.decompress(log.read(entry["length"])))
+
+    @staticmethod
+    def records(crewid: str, name: str = None, kind: str = None):
+        """
+        Iterate over a run's records in log order, optionally only those with a given name or kind.
+
+        Yields:
+            Record dicts
+        """
+        artifact_writer.flush(crewid)
+        log_path = PromptLog._paths(crewid)[0]
+        if not log_path.exists():
+            return
+        with gzip.open(log_path, "rt", encoding="utf-8") as log:
+            for line in log:
+                record = json.loads(line)
+                if (name is None or record["name"] == name) and (kind is None or record["kind"] == kind):
+                    yield record
@@ -0,0 +1,50 @@
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+OUTPUT_DIR = Path("./output")
+PROMPTS_DIR = Path("./prompts")
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """Everything that identifies one research run: its crew ID and where its files go."""
+
+    crewid: str
+    output_dir: Path
+    prompts_dir: Path
+
+    @staticmethod
+    def for_crewid(crewid: str) -> "RunContext":
+        return RunContext(crewid=crewid, output_dir=OUTPUT_DIR / crewid, prompts_dir=PROMPTS_DIR / crewid)
+
+
+# The run the current request, step thread or task works for. Threads started through
+# the scheduler and coroutines started through utils.aio inherit it; asyncio tasks and
+# asyncio.to_thread copy it natively.
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+def current_run():
+    """Return the active RunContext, or None outside of a run."""
+    return _current_run.get()
+
+
+@contextmanager
+def run_context(crewid: str):
+    """
+    Make crewid the active run for the code inside the with-block.
+
+    Args:
+        crewid: The crew ID of the run
+
+    Yields:
+        The active RunContext
+    """
+    run = RunContext.for_crewid(crewid)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
@@ -0,0 +1,42 @@
+import threading
+from collections import OrderedDict
+
+from utils.config import Config
+
+
+class RunStats:
+    """
+    Per-run counters (cache hits, misses, ...), keyed by crew ID. Only the
+    Config.RUN_STATS_MAX_RUNS most recently active runs are kept.
+    """
+
+    _stats = OrderedDict()  # crewid -> counters, least recently active first
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _run(crewid: str) -> dict:
+        # Called with the lock held
+        stats = RunStats._stats.get(crewid)
+        if stats is None:
+            stats = RunStats._stats[crewid] = {}
+            while len(RunStats._stats) > Config.RUN_STATS_MAX_RUNS:
+                RunStats._stats.popitem(last=False)
+        else:
+            RunStats._stats.move_to_end(crewid)
+        return stats
+
+    @staticmethod
+    def incr(crewid: str, name: str, amount: int = 1) -> None:
+        with RunStats._lock:
+            stats = RunStats._run(crewid)
+            stats[name] = stats.get(name, 0) + amount
+
+    @staticmethod
+    def set(crewid: str, name: str, value) -> None:
+        with RunStats._lock:
+            RunStats._run(crewid)[name] = value
+
+    @staticmethod
+    def get(crewid: str) -> dict:
+        with RunStats._lock:
+            return dict(RunStats._stats.get(crewid, {}))
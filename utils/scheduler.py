@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from utils.config import Config
+from utils.metrics import metrics
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+
+class _Limit:
+    """
+    A named concurrency limit that tracks how many callers are running and waiting.
+    Waiters are served first come, first served: release() hands its slot straight to
+    the oldest waiter by resolving its future on the waiter's own event loop.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters = deque()  # (loop, future) of each waiting coroutine
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+            self.queued += 1
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = waiter not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(waiter)
+                    self.queued -= 1
+            if handed_over:
+                # release() already gave us the slot; pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                self.queued -= 1
+                # The slot passes to the waiter as is, so in_flight does not change
+                try:
+                    loop.call_soon_threadsafe(_hand_over, future)
+                    return
+                except RuntimeError:
+                    continue  # its loop is closed; try the next waiter
+            self.in_flight -= 1
+
+
+def _hand_over(future: asyncio.Future) -> None:
+    # A waiter cancelled in the meantime releases the slot itself (see _Limit.acquire)
+    if not future.done():
+        future.set_result(None)
+
+
+class Scheduler:
+    """
+    Process-wide scheduler shared by every request: bounded concurrency for LLM calls,
+    search calls and page fetches, and a bounded pool for research steps.
+    """
+
+    def __init__(self, limits: dict, step_workers: int):
+        self._limits = {name: _Limit(name, limit) for name, limit in limits.items()}
+        self._step_workers = step_workers
+        self._step_pool = None
+        self._step_lock = threading.Lock()
+        self._steps_queued = 0
+        self._steps_running = 0
+
+    @asynccontextmanager
+    async def aslot(self, kind: str):
+        """Hold one of the process-wide slots for kind ("llm", "search" or "fetch")."""
+        limit = self._limits[kind]
+        await limit.acquire()
+        try:
+            yield
+        finally:
+            limit.release()
+
+    def submit_step(self, fn, *args) -> Future:
+        """
+        Run a research step. With Config.USE_THREADS the step is queued on the shared
+        step pool, otherwise it runs right away on the calling thread. Either way it
+        runs in a copy of the caller's context, so it works for the caller's run.
+        """
+        if not Config.USE_THREADS:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        with self._step_lock:
+            if self._step_pool is None:
+                self._step_pool = ThreadPoolExecutor(max_workers=self._step_workers, thread_name_prefix="step")
+            self._steps_queued += 1
+
+        context = contextvars.copy_context()
+
+        def _run():
+            with self._step_lock:
+                self._steps_queued -= 1
+                self._steps_running += 1
+            try:
+                return context.run(fn, *args)
+            finally:
+                with self._step_lock:
+                    self._steps_running -= 1
+
+        return self._step_pool.submit(_run)
+
+    def stats(self) -> dict:
+        """Current in-flight and queued (waiting) counts per limit, plus the step pool."""
+        stats = {
+            name: {"limit": limit.limit, "in_flight": limit.in_flight, "queued": limit.queued}
+            for name, limit in self._limits.items()
+        }
+        stats["steps"] = {
+            "limit": self._step_workers if Config.USE_THREADS else 1,
+            "in_flight": self._steps_running,
+            "queued": self._steps_queued,
+        }
+        return stats
+
+
+scheduler = Scheduler(
+    limits={
+        "llm": Config.MAX_CONCURRENT_LLM_CALLS,
+        "search": Config.MAX_CONCURRENT_SEARCHES,
+        "fetch": Config.FETCH_WORKERS_PER_PROCESS,
+    },
+    step_workers=Config.MAX_STEP_WORKERS,
+)
+
+metrics.gauge("scheduler_in_flight", "Work holding a scheduler slot, by kind (llm, search, fetch, steps).", ("kind",),
+              collect=lambda: {kind: stats["in_flight"] for kind, stats in scheduler.stats().items()})
+metrics.gauge("scheduler_queued", "Work waiting for a scheduler slot, by kind (llm, search, fetch, steps).", ("kind",),
+              collect=lambda: {kind: stats["queued"] for kind, stats in scheduler.stats().items()})
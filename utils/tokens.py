@@ -0,0 +1,78 @@
+import re
+
+# Fast local token estimate. Typical BPE vocabularies average about four characters
+# per token on English prose; punctuation and markup runs count a little higher.
+# This is only used for budgeting, never for billing, so it errs on the high side.
+_CHARS_PER_TOKEN = 4
+_SYMBOL_RUN = re.compile(r"[^\w\s]{2,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many model tokens a text will use, without a tokenizer.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    symbols = sum(len(run) for run in _SYMBOL_RUN.findall(text))
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN + symbols // 2
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Deterministically cap a text at roughly max_tokens, cutting at a whitespace boundary.
+
+    Args:
+        text: The text to cap
+        max_tokens: Token budget for the result
+
+    Returns:
+        The text itself if it fits, otherwise its longest prefix that fits
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, min(len(text), max_tokens * _CHARS_PER_TOKEN)
+    # Binary search the longest prefix that fits; symbol-heavy text needs a shorter cut
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text.rfind(" ", 0, low)
+    return text[:cut if cut > low // 2 else low]
+
+
+def split_to_tokens(text: str, max_tokens: int) -> list:
+    """
+    Split a text into consecutive chunks of at most roughly max_tokens each,
+    preferring paragraph, then line, then word boundaries.
+
+    Args:
+        text: The text to split
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List of chunks that together make up the text
+    """
+    chunks = []
+    rest = text
+    while estimate_tokens(rest) > max_tokens:
+        head = truncate_to_tokens(rest, max_tokens)
+        for boundary in ("\n\n", "\n"):
+            cut = head.rfind(boundary)
+            if cut > len(head) // 2:
+                head = head[:cut + len(boundary)]
+                break
+        if not head:
+            head = rest[:max_tokens]
+        chunks.append(head)
+        rest = rest[len(head):]
+    if rest.strip() or not chunks:
+        chunks.append(rest)
+    return chunks
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import threading
+
+from utils.run_stats import RunStats
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+# Per-run stat counting the work a registry hit saved
+_SAVED_STAT = {"fetch": "fetches_saved", "summary": "summaries_saved"}
+
+
+class UrlRegistry:
+    """
+    Per-run registry of page work, shared by all steps of a run. Work is single-flight:
+    the first step to ask for a page's fetch or summary does it, every other step awaits
+    or reuses that result. All callers run on the shared research event loop.
+    """
+
+    _runs = {}  # crewid -> {(kind, url): Future}
+    _lock = threading.Lock()
+
+    @staticmethod
+    async def single_flight(crewid: str, kind: str, url: str, work):
+        """
+        Run work() once per run for (kind, url) and share its result.
+
+        Args:
+            crewid: The run the work belongs to
+            kind: What is done with the url, e.g. "fetch" or "summary"
+            url: Normalized url
+            work: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            The result of work(); an exception it raised is re-raised to every caller
+        """
+        while True:
+            with UrlRegistry._lock:
+                run = UrlRegistry._runs.setdefault(crewid, {})
+                future = run.get((kind, url))
+                owner = future is None
+                if owner:
+                    future = asyncio.get_running_loop().create_future()
+                    run[(kind, url)] = future
+
+            if owner:
+                return await UrlRegistry._run(crewid, kind, url, work, future)
+
+            RunStats.incr(crewid, _SAVED_STAT.get(kind, f"{kind}_saved"))
+            logger.debug("Reusing %s of %s from another step", kind, url)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The owner was cancelled rather than us: take over the work
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+    @staticmethod
+    async def _run(crewid: str, kind: str, url: str, work, future: asyncio.Future):
+        try:
+            result = await work()
+        except asyncio.CancelledError:
+            with UrlRegistry._lock:
+                UrlRegistry._runs.get(crewid, {}).pop((kind, url), None)
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it themselves; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        future.set_result(result)
+        return result
+
+    @staticmethod
+    def clear(crewid: str) -> None:
+        """Forget a run's entries once the run has finished."""
+        with UrlRegistry._lock:
+            UrlRegistry._runs.pop(crewid, None)
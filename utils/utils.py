@@ -1,6 +1,7 @@
 import os
 import re
 import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 # Get the logger
 logger = logging.getLogger(__name__)
@@ -27,6 +28,32 @@ def clean_emoji(input_text: str) -> str:
     return emoji_pattern.sub(r'', input_text)
 
 
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different spellings of the same page compare equal.
+
+    Lowercases the scheme and host, drops the fragment, default ports, tracking
+    parameters (utm_*, fbclid, gclid) and a trailing slash, and sorts the query string.
+
+    Args:
+        url: URL to normalize
+
+    Returns:
+        The normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith("utm_") or k.lower() in ("fbclid", "gclid"))
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
 def create_subfolder(parent_dir, subfolder_name):
   """Creates a subfolder, even if it already exists.
 
@@ -37,9 +64,9 @@ def create_subfolder(parent_dir, subfolder_name):
   try:
     subfolder_path = os.path.join(parent_dir, subfolder_name)
     os.makedirs(subfolder_path, exist_ok=True)
-    logger.debug(f"Subfolder '{subfolder_name}' created (or already exists) at '{subfolder_path}'")
+    logger.debug("Subfolder '%s' created (or already exists) at '%s'", subfolder_name, subfolder_path)
   except OSError as e:
-    logger.debug(f"Error creating subfolder: {e}")
+    logger.debug("Error creating subfolder: %s", e)
 
 def get_report_css_style() -> str:
     """
@@ -0,0 +1,122 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+# Get the logger
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 256
+
+
+class ArtifactWriter:
+    """
+    Write-behind writer for run artifacts (prompts, step reports, logs). Writes are queued
+    and done in batches by one background thread, off the request and step threads.
+    Until a queued write lands its content is served by pending(), so readers always see
+    their own writes. flush() waits for a run's writes; write_now() is for artifacts that
+    must be durable when the call returns.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = {}  # path -> content of the latest queued write
+        self._pending_by_run = defaultdict(int)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def ensure_dir(self, path: Path) -> None:
+        """
+        Create a directory if it does not exist. Nothing is remembered between calls, so a
+        run directory deleted in the meantime is created again.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, crewid: str, path: Path, content: str, errors: str = "strict") -> None:
+        """Queue a text file write for the run crewid."""
+        def _write():
+            try:
+                self.ensure_dir(path.parent)
+                with open(path, "w", encoding="utf-8", errors=errors) as file:
+                    file.write(content)
+            finally:
+                with self._cond:
+                    if self._pending.get(path) is content:
+                        del self._pending[path]
+
+        with self._cond:
+            self._pending[path] = content
+        self.submit(crewid, _write, str(path))
+
+    def submit(self, crewid: str, job, description: str = "artifact") -> None:
+        """
+        Queue any write job for the run crewid. Jobs run one at a time in submission
+        order, so appends to the same file need no further locking.
+        """
+        with self._cond:
+            self._pending_by_run[crewid] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((crewid, job, description))
+
+    def write_now(self, path: Path, content: str, errors: str = "strict") -> None:
+        """Write a file synchronously and durably: temp file, fsync, then atomic rename."""
+        self.ensure_dir(path.parent)
+        temp_path = path.with_name(f".{path.name}.tmp")
+        with open(temp_path, "w", encoding="utf-8", errors=errors) as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    def pending(self, path: Path):
+        """Content of a queued write to path that has not landed yet, or None."""
+        with self._cond:
+            return self._pending.get(path)
+
+    def pending_names(self, directory: Path) -> set:
+        """Names of files in directory with a queued write that has not landed yet."""
+        with self._cond:
+            return {path.name for path in self._pending if path.parent == directory}
+
+    def flush(self, crewid: str = None, timeout: float = None) -> bool:
+        """
+        Wait until the queued writes of crewid (or of every run) have landed.
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._cond:
+            if crewid is None:
+                return self._cond.wait_for(lambda: not any(self._pending_by_run.values()), timeout)
+            return self._cond.wait_for(lambda: not self._pending_by_run.get(crewid), timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for crewid, job, description in batch:
+                try:
+                    job()
+                except Exception as e:
+                    logger.error(f"Error writing {description}: {e}")
+                with self._cond:
+                    self._pending_by_run[crewid] -= 1
+                    if not self._pending_by_run[crewid]:
+                        del self._pending_by_run[crewid]
+            with self._cond:
+                self._cond.notify_all()
+            logger.debug("Wrote %s queued artifacts", len(batch))
+
+
+artifact_writer = ArtifactWriter()
+# Queued artifacts must not be lost when the process exits normally
+atexit.register(artifact_writer.flush, None, 30)